@@ -0,0 +1,136 @@
+import asyncio
+import json
+import random
+from urllib.parse import urlencode
+
+import aiohttp
+
+from YeezyAPI import accounts_by_uid, chunked
+
+
+class AsyncYeezyAPI:
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, base_url="https://yeezypay.io/api/v1/google", concurrency=10, retries=3, backoff=0.5,
+                 timeout=30, chunk_size=100):
+        self._BASE_API_URL = base_url
+        self._HEADERS = {
+            'Accept': 'application/json',
+            'Content-Type': 'application/json'
+        }
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self._batch_supported = True
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._session = None
+
+    async def __aenter__(self):
+        # keep-alive з'єднання перевикористовуються між запитами
+        connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60)
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            headers=self._HEADERS,
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._session.close()
+
+    def _backoff_delay(self, attempt):
+        # full jitter, щоб повтори не йшли пачкою
+        return random.uniform(0, self.backoff * 2 ** attempt)
+
+    async def _request(self, method, path, headers=None, data=None):
+        url = self._BASE_API_URL + path
+        error = None
+        for attempt in range(self.retries + 1):
+            try:
+                async with self._semaphore:
+                    async with self._session.request(method, url, headers=headers, data=data) as response:
+                        status = response.status
+                        text = await response.text()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = str(e) or e.__class__.__name__
+            else:
+                if status not in self.RETRY_STATUSES:
+                    return status, text
+                error = f"HTTP {status}: {text}"
+
+            if attempt < self.retries:
+                await asyncio.sleep(self._backoff_delay(attempt))
+        return None, error
+
+    @staticmethod
+    def _parse(name, status, text):
+        if status is None or status >= 400:
+            print(f"{name} error: {text}")
+            return
+        try:
+            body = json.loads(text)
+        except ValueError:
+            print(f"{name} error: {text}")
+            return
+        if bool(body.get('state', False)) is False:
+            print(f"{name} error: {text}")
+            return
+        return body
+
+    async def generate_auth(self, mcc_id, mcc_secret_token):
+        payload = json.dumps({
+            "account_id": mcc_id,
+            "secret": mcc_secret_token,
+            "timeout": 1200
+        })
+
+        status, text = await self._request("POST", "/auth", data=payload)
+        return self._parse("generate_auth", status, text)
+
+    async def get_verify_account(self, auth_token, account_uid):
+        auth = {'Authorization': f'Bearer {auth_token}'}
+
+        status, text = await self._request("GET", f"/accounts?uid={account_uid}", headers=auth)
+        return self._parse("get_verify_account", status, text)
+
+    async def _verify_single(self, auth_token, account_uid):
+        response = await self.get_verify_account(auth_token, account_uid)
+        return accounts_by_uid(response, [account_uid]) if response else {}
+
+    async def _verify_chunk(self, auth_token, chunk):
+        found = {}
+        if len(chunk) > 1 and self._batch_supported:
+            auth = {'Authorization': f'Bearer {auth_token}'}
+            query = urlencode([('uid', uid) for uid in chunk])
+            status, text = await self._request("GET", f"/accounts?{query}", headers=auth)
+            response = self._parse("get_verify_accounts", status, text)
+            if response:
+                found = accounts_by_uid(response, chunk)
+                # успішна відповідь без жодного збігу: API, схоже, ігнорує кілька uid — далі поодинці
+                if not found:
+                    self._batch_supported = False
+            elif status is not None and 400 <= status < 500:
+                # API не приймає кілька uid — далі тільки поодинці
+                self._batch_supported = False
+
+        # Те, що не повернулось пачкою, добираємо поодинці
+        missing = [uid for uid in chunk if uid not in found]
+        for single in await asyncio.gather(*(self._verify_single(auth_token, uid) for uid in missing)):
+            found.update(single)
+        return [(uid, found.get(uid)) for uid in chunk]
+
+    async def verify_accounts(self, auth_token, account_uids, chunk_size=None):
+        """Перевіряє акаунти пачками паралельно і віддає (uid, account) у міру готовності."""
+        tasks = [
+            asyncio.create_task(self._verify_chunk(auth_token, chunk))
+            for chunk in chunked(account_uids, chunk_size or self.chunk_size)
+        ]
+        try:
+            for task in asyncio.as_completed(tasks):
+                for result in await task:
+                    yield result
+        finally:
+            for task in tasks:
+                task.cancel()
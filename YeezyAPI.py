@@ -2,6 +2,31 @@ import json
 
 import requests
 
+# Ключі, під якими API може повертати uid акаунта
+ACCOUNT_UID_KEYS = ('uid', 'account_uid', 'sub_account_uid')
+
+
+def chunked(items, size):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def accounts_by_uid(response, account_uids):
+    accounts = response.get('accounts') or []
+    if len(account_uids) == 1:
+        return {account_uids[0]: accounts[0]} if accounts else {}
+
+    wanted = {str(uid): uid for uid in account_uids}
+    result = {}
+    for account in accounts:
+        for key in ACCOUNT_UID_KEYS:
+            uid = wanted.get(str(account.get(key)))
+            if uid is not None:
+                result[uid] = account
+                break
+    return result
+
 
 class YeezyAPI:
     def __init__(self):
@@ -38,4 +63,3 @@ class YeezyAPI:
             return
 
         return response.json()
-
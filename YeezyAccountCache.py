@@ -0,0 +1,101 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+# Акаунти в цих статусах вже не змінюються
+TERMINAL_STATUSES = ('CLOSED', 'FORCE_CLOSED')
+
+DEFAULT_TTL_BY_STATUS = {
+    **{status: 30 * 24 * 60 * 60 for status in TERMINAL_STATUSES},
+    'INACTIVE': 60 * 60,
+}
+
+
+class YeezyAccountCache:
+    """
+    Локальний SQLite-кеш відповідей /accounts за uid.
+    TTL залежить від статусу: закриті акаунти живуть довго, активні — кілька хвилин.
+    """
+
+    def __init__(self, path='temp/yeezy_accounts.sqlite', ttl_by_status=None, default_ttl=10 * 60):
+        self.path = path
+        self.ttl_by_status = DEFAULT_TTL_BY_STATUS if ttl_by_status is None else ttl_by_status
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._con = sqlite3.connect(path, check_same_thread=False)
+        self._con.execute(
+            "CREATE TABLE IF NOT EXISTS accounts ("
+            "uid TEXT PRIMARY KEY, status TEXT, account TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._con.commit()
+
+    def ttl_for(self, account):
+        return self.ttl_by_status.get(account.get('status'), self.default_ttl)
+
+    def get_many(self, account_uids):
+        """Повертає ({uid: account} для свіжих записів, [uid, які треба перевірити через API])."""
+        account_uids = list(account_uids)
+        rows = {}
+        with self._lock:
+            keys = [str(uid) for uid in account_uids]
+            # SQLite обмежує кількість параметрів у запиті
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows.update(
+                    (uid, (account, expires_at)) for uid, account, expires_at in self._con.execute(
+                        f"SELECT uid, account, expires_at FROM accounts WHERE uid IN ({placeholders})", chunk)
+                )
+
+        now = time.time()
+        cached, missing = {}, []
+        for uid in account_uids:
+            row = rows.get(str(uid))
+            if row is None:
+                self.misses += 1
+                missing.append(uid)
+            elif row[1] < now:
+                self.stale += 1
+                missing.append(uid)
+            else:
+                self.hits += 1
+                cached[uid] = json.loads(row[0])
+        return cached, missing
+
+    def put_many(self, accounts):
+        now = time.time()
+        rows = [
+            (str(uid), account.get('status'), json.dumps(account, default=str), now + self.ttl_for(account))
+            for uid, account in accounts.items() if account
+        ]
+        with self._lock:
+            self._con.executemany("INSERT OR REPLACE INTO accounts VALUES (?, ?, ?, ?)", rows)
+            self._con.commit()
+
+    def invalidate(self, account_uids=None):
+        with self._lock:
+            if account_uids is None:
+                self._con.execute("DELETE FROM accounts")
+            else:
+                self._con.executemany("DELETE FROM accounts WHERE uid = ?", [(str(uid),) for uid in account_uids])
+            self._con.commit()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'stale': self.stale}
+
+    def log_stats(self):
+        total = self.hits + self.misses + self.stale
+        ratio = self.hits / total if total else 0
+        logging.info(f"Yeezy account cache: {self.hits} hits, {self.misses} misses, {self.stale} stale "
+                     f"({ratio:.0%} hit rate)")
+
+    def close(self):
+        with self._lock:
+            self._con.close()
@@ -0,0 +1,183 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import pymysql
+
+from databases.DbExecutor import DB_WORKERS
+from private_cfg import DB_PASSWORD
+
+# Помилки, після яких з'єднання вже не можна повертати в пул
+_BROKEN_ERRORS = (pymysql.err.OperationalError, pymysql.err.InterfaceError)
+
+
+class ConnectionPool:
+    # кожен потік db_executor може тримати з'єднання до однієї БД, тож пул не менший за них
+    def __init__(self, db_name, max_size=DB_WORKERS, idle_timeout=300, ping_interval=30, wait_timeout=30):
+        self.db_name = db_name
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.ping_interval = ping_interval
+        self.wait_timeout = wait_timeout
+
+        self._idle = []  # [(connection, last_used)]
+        self._size = 0  # усі відкриті з'єднання: вільні + видані
+        self._condition = threading.Condition()
+
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.evicted = 0
+        self.broken = 0
+
+    def _connect(self):
+        # autocommit, щоб кожен SELECT бачив свіжі дані, а не знімок старої транзакції
+        return pymysql.connect(
+            host="localhost",
+            user="root",
+            password=DB_PASSWORD,
+            db=self.db_name,
+            charset="utf8mb4",
+            cursorclass=pymysql.cursors.DictCursor,
+            autocommit=True
+        )
+
+    def _evict_idle(self):
+        now = time.monotonic()
+        fresh = []
+        for con, last_used in self._idle:
+            if now - last_used > self.idle_timeout:
+                self._close(con)
+                self._size -= 1
+                self.evicted += 1
+            else:
+                fresh.append((con, last_used))
+        self._idle = fresh
+
+    @staticmethod
+    def _close(con):
+        try:
+            con.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, con, last_used):
+        if time.monotonic() - last_used < self.ping_interval:
+            return True
+        try:
+            con.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def acquire(self):
+        started = time.monotonic()
+        while True:
+            with self._condition:
+                self._evict_idle()
+                while not self._idle and self._size >= self.max_size:
+                    remaining = self.wait_timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        raise TimeoutError(f"({self.db_name}) no free connection in {self.wait_timeout}s")
+                    self.waits += 1
+                    self._condition.wait(remaining)
+                    self._evict_idle()
+
+                self.wait_time += time.monotonic() - started
+                if self._idle:
+                    con, last_used = self._idle.pop()
+                else:
+                    self._size += 1
+                    self.misses += 1
+                    con = None
+
+            if con is None:
+                try:
+                    return self._connect()
+                except Exception:
+                    self._discard()
+                    raise
+
+            if self._is_healthy(con, last_used):
+                with self._condition:
+                    self.hits += 1
+                return con
+
+            self._close(con)
+            self._discard(broken=True)
+            started = time.monotonic()
+
+    def release(self, con, broken=False):
+        if broken or not con.open:
+            self._close(con)
+            self._discard(broken=True)
+            return
+        with self._condition:
+            self._idle.append((con, time.monotonic()))
+            self._condition.notify()
+
+    def _discard(self, broken=False):
+        with self._condition:
+            self._size -= 1
+            if broken:
+                self.broken += 1
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self):
+        con = self.acquire()
+        try:
+            yield con
+        except _BROKEN_ERRORS:
+            self.release(con, broken=True)
+            raise
+        except BaseException:
+            self.release(con)
+            raise
+        else:
+            self.release(con)
+
+    def close(self):
+        with self._condition:
+            for con, _ in self._idle:
+                self._close(con)
+            self._size -= len(self._idle)
+            self._idle = []
+
+    def stats(self):
+        with self._condition:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'hits': self.hits,
+                'misses': self.misses,
+                'waits': self.waits,
+                'wait_time': round(self.wait_time, 3),
+                'evicted': self.evicted,
+                'broken': self.broken,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_name):
+    with _pools_lock:
+        if db_name not in _pools:
+            _pools[db_name] = ConnectionPool(db_name)
+        return _pools[db_name]
+
+
+def pool_stats():
+    with _pools_lock:
+        pools = dict(_pools)
+    return {db_name: pool.stats() for db_name, pool in pools.items()}
+
+
+def close_all_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,13 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+# pymysql блокуючий: запити з async-коду йдуть в окремий пул потоків,
+# щоб не займати loop і не ділити default executor з запитами до Sheets
+DB_WORKERS = 8
+db_executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix='db')
+
+
+async def run_db(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, functools.partial(func, *args, **kwargs))
@@ -1,33 +1,109 @@
+import time
+
 import pymysql
 
-from private_cfg import *
+from databases.ConnectionPool import get_pool
+from databases.QueryCache import query_cache
+from databases.WatermarkCache import watermark_cache
 
 
 class DefaultDataBase:
     def __init__(self, db_name):
-        self.__connection = pymysql.connect(
-            host="localhost",
-            user="root",
-            password=DB_PASSWORD,
-            db=db_name,
-            charset="utf8mb4",
-            cursorclass=pymysql.cursors.DictCursor
-        )
+        self.__db_name = db_name
+        self.__pool = get_pool(db_name)
 
     def _select(self, query, args=None):
+        # в межах query_cache.scope() однакові запити читають таблицю один раз
+        key = (self.__db_name, query, tuple(args) if isinstance(args, list) else args)
+        try:
+            hash(key)
+        except TypeError:
+            return self._select_uncached(query, args)
+        return query_cache.get_or_load(key, lambda: self._select_uncached(query, args))
+
+    def _select_uncached(self, query, args=None):
         try:
-            with self.__connection as con:
+            with self.__pool.connection() as con:
                 with con.cursor() as cursor:
                     cursor.execute(query, args)
                     return cursor.fetchall()
         except Exception as e:
-            print(f"{5*'*'}\n({self.__connection.db}) _select_all: {e}\n\n {query} | {args}\n{5*'*'}\n\n")
+            print(f"{5*'*'}\n({self.__db_name}) _select_all: {e}\n\n {query} | {args}\n{5*'*'}\n\n")
 
     def _select_one(self, query, args=None):
         try:
-            with self.__connection as con:
+            with self.__pool.connection() as con:
                 with con.cursor() as cursor:
                     cursor.execute(query, args)
                     return cursor.fetchone()
         except Exception as e:
-            print(f"{5*'*'}\n({self.__connection.db}) _select_one: {e}\n\n {query} | {args}\n{5*'*'}\n\n")
+            print(f"{5*'*'}\n({self.__db_name}) _select_one: {e}\n\n {query} | {args}\n{5*'*'}\n\n")
+
+    def _select_stream(self, query, args=None, fetch_size=1000):
+        """
+        Генератор рядків через серверний курсор, не тримає всю вибірку в пам'яті.
+        Помилку не ковтає: частина листа вже може бути записана, тож викликач має про неї знати.
+        """
+        try:
+            with self.__pool.connection() as con:
+                with con.cursor(pymysql.cursors.SSDictCursor) as cursor:
+                    cursor.execute(query, args)
+                    while True:
+                        rows = cursor.fetchmany(fetch_size)
+                        if not rows:
+                            break
+                        yield from rows
+        except Exception as e:
+            print(f"{5*'*'}\n({self.__db_name}) _select_stream: {e}\n\n {query} | {args}\n{5*'*'}\n\n")
+            raise
+
+    def get_schema_columns(self):
+        """{table: {column, ...}} поточної БД з information_schema."""
+        rows = self._select_uncached(
+            'SELECT `TABLE_NAME` AS table_name, `COLUMN_NAME` AS column_name '
+            'FROM `information_schema`.`COLUMNS` WHERE `TABLE_SCHEMA` = %s;',
+            (self.__db_name,)
+        )
+        if rows is None:
+            return None
+        schema = {}
+        for row in rows:
+            schema.setdefault(row['table_name'], set()).add(row['column_name'])
+        return schema
+
+    def _select_incremental(self, table, order_by, key_column='id', watermark_column='id', columns='*'):
+        """
+        Вибирає тільки рядки після збереженого watermark і зливає їх з локальною копією таблиці.
+        Результат відсортований як `ORDER BY order_by DESC`. columns — список колонок для SELECT.
+        """
+        state = watermark_cache.load(self.__db_name, table)
+        # локальна копія з іншим набором колонок не годиться для злиття
+        if state is not None and state.get('columns', '*') != columns:
+            state = None
+        if state is None:
+            refreshed_at = time.time()
+            rows = self._select(f'SELECT {columns} FROM `{table}` ORDER BY `{order_by}` DESC;')
+            if rows is None:
+                return None
+            merged = list(rows)
+        else:
+            refreshed_at = state['refreshed_at']
+            new_rows = self._select(
+                f'SELECT {columns} FROM `{table}` WHERE `{watermark_column}` > %s ORDER BY `{watermark_column}`;',
+                (state['watermark'],)
+            )
+            if new_rows is None:
+                return None
+            if not new_rows:
+                return list(state['rows'])
+
+            by_key = {row[key_column]: row for row in state['rows']}
+            by_key.update((row[key_column], row) for row in new_rows)
+            # як у MySQL: NULL в кінці при DESC
+            merged = sorted(by_key.values(), key=lambda row: (row[order_by] is not None, row[order_by]),
+                            reverse=True)
+
+        watermarks = [row[watermark_column] for row in merged if row[watermark_column] is not None]
+        if watermarks:
+            watermark_cache.save(self.__db_name, table, max(watermarks), merged, refreshed_at, columns)
+        return list(merged)
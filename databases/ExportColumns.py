@@ -0,0 +1,109 @@
+import logging
+from collections import defaultdict
+
+from databases.DefaultDataBase import DefaultDataBase
+from private_cfg import (GOOGLE_AGENCY_DB, MT_APPS_RENT_DB, MT_AUTO_MODERATOR_DB, MT_MESSAGING_DB,
+                         MT_SHOP_DB)
+
+# Вивантаження -> (БД, таблиця, колонки[, ключові колонки]). None — всі колонки: лист показує таблицю як є.
+# Колонки перелічені тільки там, де код або лист використовує конкретні поля.
+# Ключові колонки потрібні інкрементальній вибірці (_select_incremental) і перевіряються навіть при `*`.
+EXPORT_COLUMNS = {
+    # google agency: process_and_upload_*, аналітика і точкові пошуки
+    'mcc_transactions': (GOOGLE_AGENCY_DB, 'transactions', ['id', 'team_name', 'created', 'value'], ['id']),
+    'account_transactions': (GOOGLE_AGENCY_DB, 'sub_transactions',
+                             ['id', 'team_name', 'sub_account_uid', 'mcc_uuid', 'created', 'value']),
+    'refunded_accounts': (GOOGLE_AGENCY_DB, 'refunded_accounts',
+                          ['account_uid', 'mcc_uuid', 'team_name', 'account_email', 'customer_id', 'created',
+                           'completed_time', 'refund_value', 'commission', 'last_spend']),
+    'sub_accounts': (GOOGLE_AGENCY_DB, 'sub_accounts',
+                     ['account_uid', 'mcc_uuid', 'team_name', 'account_email', 'customer_id', 'created']),
+    'mcc': (GOOGLE_AGENCY_DB, 'mcc', ['mcc_uuid', 'mcc_name']),
+    'taxes': (GOOGLE_AGENCY_DB, 'taxes', None),
+
+    # таблиці, що вивантажуються в Sheets повністю
+    'shop_orders': (MT_SHOP_DB, 'orders', None, ['id', 'date']),
+    'shop_users': (MT_SHOP_DB, 'users', None),
+    'shop_items': (MT_SHOP_DB, 'items', None),
+    'shop_categories': (MT_SHOP_DB, 'categories', None),
+    'team_info_chats': (MT_MESSAGING_DB, 'chats', None),
+    'team_info_users': (MT_MESSAGING_DB, 'users', None),
+    'auto_moderator_users': (MT_AUTO_MODERATOR_DB, 'users', None),
+    'apps_rent_users': (MT_APPS_RENT_DB, 'users', None),
+    'apps_rent_teams': (MT_APPS_RENT_DB, 'teams', None),
+    'apps_rent_flows': (MT_APPS_RENT_DB, 'flows', None),
+    'apps_rent_domains': (MT_APPS_RENT_DB, 'domains', None),
+    'apps_rent_apps': (MT_APPS_RENT_DB, 'apps', None),
+}
+
+
+class ExportColumns:
+    """Списки колонок для кожного вивантаження, з яких репозиторії будують SELECT замість `*`."""
+
+    def __init__(self, exports):
+        self.exports = exports
+        # вивантаження, чиї колонки не знайшлись у схемі, читаються як `*`
+        self.disabled = set()
+        # вивантаження без ключових колонок читаються повністю, а не інкрементально
+        self.unkeyed = set()
+
+    def columns(self, export):
+        columns = self.exports[export][2]
+        if columns is None or export in self.disabled:
+            return None
+        return columns
+
+    def key_columns(self, export):
+        return self.exports[export][3] if len(self.exports[export]) > 3 else []
+
+    def incremental(self, export):
+        """Чи можна читати вивантаження через _select_incremental: ключові колонки є в схемі."""
+        return export not in self.unkeyed
+
+    def projection(self, export, alias=None):
+        columns = self.columns(export)
+        prefix = f"{alias}." if alias else ""
+        if columns is None:
+            return f"{prefix}*"
+        return ", ".join(f"{prefix}`{column}`" for column in columns)
+
+    def validate(self, schema_loader):
+        """
+        Звіряє списки з information_schema. schema_loader(db_name) -> {table: {column, ...}} або None.
+        Вивантаження з відсутніми колонками або таблицями відкочуються на `*`.
+        """
+        by_db = defaultdict(list)
+        for export, (db_name, table, columns, *_) in self.exports.items():
+            key_columns = self.key_columns(export)
+            if columns is not None or key_columns:
+                by_db[db_name].append((export, table, columns or [], key_columns))
+
+        self.disabled.clear()
+        self.unkeyed.clear()
+        for db_name, exports in by_db.items():
+            schema = schema_loader(db_name)
+            if schema is None:
+                logging.warning(f"Export columns: schema of {db_name} is unavailable, not validated")
+                continue
+            for export, table, columns, key_columns in exports:
+                table_columns = schema.get(table, ())
+                missing = [column for column in columns if column not in table_columns]
+                if missing:
+                    self.disabled.add(export)
+                    logging.error(f"Export columns: {export} ({db_name}.{table}) has no columns {missing}, "
+                                  f"falling back to SELECT *")
+                missing_keys = [column for column in key_columns if column not in table_columns]
+                if missing_keys:
+                    self.unkeyed.add(export)
+                    logging.error(f"Export columns: {export} ({db_name}.{table}) has no key columns {missing_keys}, "
+                                  f"falling back to a full SELECT instead of incremental reads")
+        logging.info(f"Export columns validated: {len(self.exports)} exports, {len(self.disabled)} disabled, "
+                     f"{len(self.unkeyed)} without key columns")
+        return not (self.disabled or self.unkeyed)
+
+
+export_columns = ExportColumns(EXPORT_COLUMNS)
+
+
+def validate_export_columns():
+    return export_columns.validate(lambda db_name: DefaultDataBase(db_name).get_schema_columns())
@@ -0,0 +1,82 @@
+import functools
+import threading
+
+from cachetools import TTLCache
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+class LookupCache:
+    """Обмежений за розміром TTL-кеш точкових вибірок з репозиторію (uid -> рядок)."""
+
+    def __init__(self, name, maxsize=4096, ttl=10 * 60):
+        self.name = name
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, loader):
+        with self._lock:
+            try:
+                value = self._cache[key]
+            except KeyError:
+                self.misses += 1
+            else:
+                self.hits += 1
+                return value
+        value = loader()
+        # None — це або відсутній рядок, або помилка запиту; не кешуємо
+        if value is not None:
+            self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._cache[key] = value
+
+    def invalidate(self, *key):
+        with self._lock:
+            if key:
+                self._cache.pop(key, None)
+            else:
+                self._cache.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._cache),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0,
+            }
+
+
+def cached_lookup(maxsize=4096, ttl=10 * 60):
+    """
+    Декоратор для методів репозиторію виду `get_x_by_key(self, key)`.
+    Кеш спільний для всіх екземплярів класу.
+    """
+
+    def decorator(method):
+        cache = LookupCache(method.__qualname__, maxsize=maxsize, ttl=ttl)
+        with _caches_lock:
+            _caches[cache.name] = cache
+
+        @functools.wraps(method)
+        def wrapper(self, *args):
+            return cache.get(args, lambda: method(self, *args))
+
+        wrapper.cache = cache
+        wrapper.invalidate = cache.invalidate
+        return wrapper
+
+    return decorator
+
+
+def lookup_cache_stats():
+    with _caches_lock:
+        caches = dict(_caches)
+    return {name: cache.stats() for name, cache in caches.items()}
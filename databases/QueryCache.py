@@ -0,0 +1,101 @@
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+def estimate_size(rows):
+    """Приблизний розмір вибірки в пам'яті, байт."""
+    return sum(sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values()) for row in rows)
+
+
+class QueryCache:
+    """
+    Кеш результатів `_select` в межах одного прогону: однаковий запит до тієї ж БД
+    з різних вивантажень читає таблицю один раз.
+    Працює тільки всередині scope(); рядки спільні для всіх, хто їх отримав, тому їх не змінюють.
+    """
+
+    def __init__(self, max_age=5 * 60):
+        self.max_age = max_age
+        self._results = {}
+        self._sizes = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self._depth = 0
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    @property
+    def active(self):
+        return self._depth > 0
+
+    @contextmanager
+    def scope(self):
+        """Вкладені і паралельні scope спільні; кеш очищується, коли завершується останній."""
+        with self._lock:
+            self._depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._depth -= 1
+                finished = self._depth == 0
+            if finished:
+                self.report()
+                self.clear()
+
+    def _fresh(self, key):
+        entry = self._results.get(key)
+        if entry is not None and time.monotonic() - entry[0] <= self.max_age:
+            return entry[1]
+        return None
+
+    def get_or_load(self, key, loader):
+        if not self.active:
+            return loader()
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        # однаковий запит з кількох потоків виконується один раз
+        with key_lock:
+            rows = self._fresh(key)
+            if rows is not None:
+                with self._lock:
+                    self.hits += 1
+                    if key not in self._sizes:
+                        self._sizes[key] = estimate_size(rows)
+                    self.bytes_saved += self._sizes[key]
+                return list(rows)
+
+            result = loader()
+            with self._lock:
+                self.misses += 1
+            # None — помилка запиту, не кешуємо
+            if result is None:
+                return None
+            rows = tuple(result)
+            with self._lock:
+                self._results[key] = (time.monotonic(), rows)
+            return list(rows)
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            self._sizes.clear()
+            self._key_locks.clear()
+            self._reset_stats()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'bytes_saved': self.bytes_saved}
+
+    def report(self):
+        logging.info(f"Query cache: {self.hits} hits, {self.misses} misses, "
+                     f"~{self.bytes_saved / 1024 / 1024:.1f} MB not re-read")
+
+
+query_cache = QueryCache()
@@ -0,0 +1,48 @@
+import logging
+import os
+import pickle
+import threading
+import time
+
+
+class WatermarkCache:
+    """Локальна копія append-mostly таблиць разом з high-water mark останньої вибірки."""
+
+    def __init__(self, directory='temp/watermarks', full_refresh_every=6 * 60 * 60):
+        self.directory = directory
+        self.full_refresh_every = full_refresh_every
+        self._memory = {}
+        self._lock = threading.Lock()
+
+    def _path(self, db_name, table):
+        return os.path.join(self.directory, f"{db_name}_{table}.pickle")
+
+    def load(self, db_name, table):
+        with self._lock:
+            state = self._memory.get((db_name, table))
+        if state is None:
+            path = self._path(db_name, table)
+            if not os.path.exists(path):
+                return None
+            try:
+                with open(path, 'rb') as file:
+                    state = pickle.load(file)
+            except Exception as e:
+                logging.warning(f"Broken watermark cache {path}: {e}")
+                return None
+
+        # Повна перевибірка підхоплює змінені/видалені рядки і пропущені id
+        if time.time() - state['refreshed_at'] > self.full_refresh_every:
+            return None
+        return state
+
+    def save(self, db_name, table, watermark, rows, refreshed_at, columns='*'):
+        state = {'watermark': watermark, 'rows': rows, 'refreshed_at': refreshed_at, 'columns': columns}
+        with self._lock:
+            self._memory[(db_name, table)] = state
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(db_name, table), 'wb') as file:
+            pickle.dump(state, file)
+
+
+watermark_cache = WatermarkCache()
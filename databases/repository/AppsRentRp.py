@@ -1,6 +1,7 @@
 import pymysql
 
 from databases.DefaultDataBase import DefaultDataBase
+from databases.ExportColumns import export_columns
 from private_cfg import DB_PASSWORD, MT_APPS_RENT_DB
 
 
@@ -9,21 +10,26 @@ class AppsRentRp(DefaultDataBase):
         super().__init__(MT_APPS_RENT_DB)
 
     def get_all_users(self):
-        _command = "SELECT * FROM `users` ORDER BY `join_at` DESC;"
+        columns = export_columns.projection('apps_rent_users')
+        _command = f"SELECT {columns} FROM `users` ORDER BY `join_at` DESC;"
         return self._select(_command)
 
     def get_all_flows(self):
-        _command = "SELECT * FROM `flows`;"
+        columns = export_columns.projection('apps_rent_flows')
+        _command = f"SELECT {columns} FROM `flows`;"
         return self._select(_command)
 
     def get_all_teams(self):
-        _command = "SELECT * FROM `teams`;"
+        columns = export_columns.projection('apps_rent_teams')
+        _command = f"SELECT {columns} FROM `teams`;"
         return self._select(_command)
 
     def get_all_domains(self):
-        _command = "SELECT * FROM `domains`;"
+        columns = export_columns.projection('apps_rent_domains')
+        _command = f"SELECT {columns} FROM `domains`;"
         return self._select(_command)
 
     def get_all_apps(self):
-        _command = "SELECT * FROM `apps`;"
+        columns = export_columns.projection('apps_rent_apps')
+        _command = f"SELECT {columns} FROM `apps`;"
         return self._select(_command)
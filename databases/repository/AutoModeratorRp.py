@@ -1,6 +1,7 @@
 import pymysql
 
 from databases.DefaultDataBase import DefaultDataBase
+from databases.ExportColumns import export_columns
 from private_cfg import DB_PASSWORD, MT_AUTO_MODERATOR_DB
 
 
@@ -9,5 +10,6 @@ class AutoModeratorRp(DefaultDataBase):
         super().__init__(MT_AUTO_MODERATOR_DB)
 
     def get_all_users(self):
-        _command = "SELECT * FROM `users` ORDER BY `time_added_at` DESC;"
+        columns = export_columns.projection('auto_moderator_users')
+        _command = f"SELECT {columns} FROM `users` ORDER BY `time_added_at` DESC;"
         return self._select(_command)
@@ -1,6 +1,20 @@
 from databases.DefaultDataBase import DefaultDataBase
+from databases.ExportColumns import export_columns
+from databases.LookupCache import cached_lookup
 from private_cfg import GOOGLE_AGENCY_DB
 
+# sub_transactions разом з email/customer_id акаунта; дублікати account_uid у sub_accounts схлопуються
+TRANSACTIONS_WITH_ACCOUNTS = '''
+    SELECT {columns}, a.`account_email` AS sub_account_email, a.`customer_id` AS sub_account_customer_id
+    FROM `sub_transactions` t
+    LEFT JOIN (
+        SELECT `account_uid`, MAX(`account_email`) AS account_email, MAX(`customer_id`) AS customer_id
+        FROM `sub_accounts`
+        GROUP BY `account_uid`
+    ) a ON a.`account_uid` = t.`sub_account_uid`
+    ORDER BY t.`id` DESC;
+'''
+
 
 class GoogleAgencyRp(DefaultDataBase):
 
@@ -8,37 +22,83 @@ class GoogleAgencyRp(DefaultDataBase):
         super().__init__(GOOGLE_AGENCY_DB)
 
     def get_taxes_transactions(self):
-        _command = f'SELECT * FROM `taxes` ORDER BY `id` DESC;'
+        columns = export_columns.projection('taxes')
+        _command = f'SELECT {columns} FROM `taxes` ORDER BY `id` DESC;'
         return self._select(_command)
 
     def get_accounts_with_team(self):
-        _command = f'SELECT * FROM `sub_accounts` WHERE `team_name` != "default" ORDER BY `created` DESC;'
+        columns = export_columns.projection('sub_accounts')
+        _command = f'SELECT {columns} FROM `sub_accounts` WHERE `team_name` != "default" ORDER BY `created` DESC;'
         return self._select(_command)
 
     def get_refunded_accounts(self):
-        _command = f'SELECT * FROM `refunded_accounts` ORDER BY `created` DESC;'
+        columns = export_columns.projection('refunded_accounts')
+        _command = f'SELECT {columns} FROM `refunded_accounts` ORDER BY `created` DESC;'
         return self._select(_command)
 
     def get_account_transactions(self):
-        _command = f'SELECT * FROM `sub_transactions` ORDER BY `id` DESC;'
+        columns = export_columns.projection('account_transactions')
+        _command = f'SELECT {columns} FROM `sub_transactions` ORDER BY `id` DESC;'
+        return self._select(_command)
+
+    def iter_account_transactions_with_accounts(self):
+        _command = TRANSACTIONS_WITH_ACCOUNTS.format(columns=export_columns.projection('account_transactions', 't'))
+        return self._select_stream(_command)
+
+    def get_distinct_accounts(self):
+        """
+        Унікальні (sub_account_uid, mcc_uuid, team_name) з транзакцій, рефандів і акаунтів команд.
+        UNION дедуплікує на стороні MySQL, тож історія транзакцій не передається повністю.
+        """
+        _command = '''
+            SELECT `sub_account_uid`, `mcc_uuid`, `team_name` FROM `sub_transactions`
+            UNION
+            SELECT `account_uid`, `mcc_uuid`, `team_name` FROM `refunded_accounts`
+            UNION
+            SELECT `account_uid`, `mcc_uuid`, `team_name` FROM `sub_accounts` WHERE `team_name` != "default"
+            ORDER BY `team_name`;
+        '''
         return self._select(_command)
 
     def get_mcc_transactions(self):
-        _command = f'SELECT * FROM `transactions` ORDER BY `id` DESC;'
+        columns = export_columns.projection('mcc_transactions')
+        _command = f'SELECT {columns} FROM `transactions` ORDER BY `id` DESC;'
+        return self._select(_command)
+
+    def get_mcc_transactions_incremental(self):
+        if not export_columns.incremental('mcc_transactions'):
+            return self.get_mcc_transactions()
+        return self._select_incremental('transactions', order_by='id',
+                                        columns=export_columns.projection('mcc_transactions'))
+
+    def get_all_accounts(self):
+        columns = export_columns.projection('sub_accounts')
+        _command = f'SELECT {columns} FROM `sub_accounts`;'
+        return self._select(_command)
+
+    def get_all_mcc(self):
+        columns = export_columns.projection('mcc')
+        _command = f'SELECT {columns} FROM `mcc`;'
         return self._select(_command)
 
+    @cached_lookup(maxsize=20000, ttl=10 * 60)
     def get_account_by_uid(self, account_uid):
-        query = "SELECT * FROM `sub_accounts` WHERE `account_uid` = %s LIMIT 1;"
+        columns = export_columns.projection('sub_accounts')
+        query = f"SELECT {columns} FROM `sub_accounts` WHERE `account_uid` = %s LIMIT 1;"
         return self._select_one(query, (account_uid,))
 
     def get_refunded_account_by_uid(self, account_uid):
-        query = "SELECT * FROM `refunded_accounts` WHERE `account_uid` = %s LIMIT 1;"
+        columns = export_columns.projection('refunded_accounts')
+        query = f"SELECT {columns} FROM `refunded_accounts` WHERE `account_uid` = %s LIMIT 1;"
         return self._select_one(query, (account_uid,))
 
+    @cached_lookup(maxsize=1024, ttl=30 * 60)
     def get_mcc_by_uuid(self, mcc_uuid):
-        query = "SELECT * FROM `mcc` WHERE `mcc_uuid` = %s LIMIT 1;"
+        columns = export_columns.projection('mcc')
+        query = f"SELECT {columns} FROM `mcc` WHERE `mcc_uuid` = %s LIMIT 1;"
         return self._select_one(query, (mcc_uuid,))
 
+    @cached_lookup(maxsize=1024, ttl=30 * 60)
     def team_by_uuid(self, team_uuid):
         query = "SELECT * FROM `teams` WHERE `team_uuid` = %s LIMIT 1;"
         return self._select_one(query, (team_uuid,))
@@ -1,6 +1,7 @@
 import pymysql
 
 from databases.DefaultDataBase import DefaultDataBase
+from databases.ExportColumns import export_columns
 from private_cfg import DB_PASSWORD, MT_SHOP_DB
 
 
@@ -9,17 +10,26 @@ class ShopRp(DefaultDataBase):
         super().__init__(MT_SHOP_DB)
 
     def get_orders_data(self):
-        _command = 'SELECT * FROM `orders` ORDER BY `date` DESC;'
+        columns = export_columns.projection('shop_orders')
+        _command = f'SELECT {columns} FROM `orders` ORDER BY `date` DESC;'
         return self._select(_command)
 
+    def get_orders_data_incremental(self):
+        if not export_columns.incremental('shop_orders'):
+            return self.get_orders_data()
+        return self._select_incremental('orders', order_by='date', columns=export_columns.projection('shop_orders'))
+
     def get_users_data(self):
-        _command = 'SELECT * FROM `users` ORDER BY `join_at` DESC;'
+        columns = export_columns.projection('shop_users')
+        _command = f'SELECT {columns} FROM `users` ORDER BY `join_at` DESC;'
         return self._select(_command)
 
     def get_items_data(self):
-        _command = 'SELECT * FROM `items` ORDER BY `date` DESC;'
+        columns = export_columns.projection('shop_items')
+        _command = f'SELECT {columns} FROM `items` ORDER BY `date` DESC;'
         return self._select(_command)
 
     def get_categories_data(self):
-        _command = 'SELECT * FROM `categories` ORDER BY `date` DESC;'
+        columns = export_columns.projection('shop_categories')
+        _command = f'SELECT {columns} FROM `categories` ORDER BY `date` DESC;'
         return self._select(_command)
@@ -1,6 +1,7 @@
 import pymysql
 
 from databases.DefaultDataBase import DefaultDataBase
+from databases.ExportColumns import export_columns
 from private_cfg import DB_PASSWORD, MT_MESSAGING_DB
 
 
@@ -10,9 +11,35 @@ class TeamInfoMessagingRp(DefaultDataBase):
         super().__init__(MT_MESSAGING_DB)
 
     def get_chat_data(self, chat_type):
-        _command = f'SELECT * FROM `chats` WHERE `{chat_type}` = 1 ORDER BY `time` DESC;'
+        columns = export_columns.projection('team_info_chats')
+        _command = f'SELECT {columns} FROM `chats` WHERE `{chat_type}` = 1 ORDER BY `time` DESC;'
         return self._select(_command)
 
+    def get_chats_by_flags(self, chat_types):
+        """
+        Один прохід по `chats` замість get_chat_data на кожен прапорець.
+        Повертає {chat_type: [рядки]}; чат з кількома прапорцями потрапляє в кілька груп.
+        """
+        condition = ' OR '.join(f'`{chat_type}` = 1' for chat_type in chat_types)
+        columns = export_columns.projection('team_info_chats')
+        _command = f'SELECT {columns} FROM `chats` WHERE {condition} ORDER BY `time` DESC;'
+        rows = self._select(_command)
+        if rows is None:
+            return None
+
+        partitions = {chat_type: [] for chat_type in chat_types}
+        for row in rows:
+            for chat_type, bucket in partitions.items():
+                if row[chat_type] == 1:
+                    bucket.append(row)
+        return partitions
+
     def get_users_from_info_bot(self):
-        _command = 'SELECT * FROM `users` ORDER BY `time` DESC;'
+        columns = export_columns.projection('team_info_users')
+        _command = f'SELECT {columns} FROM `users` ORDER BY `time` DESC;'
         return self._select(_command)
+
+    def iter_users_from_info_bot(self):
+        columns = export_columns.projection('team_info_users')
+        _command = f'SELECT {columns} FROM `users` ORDER BY `time` DESC;'
+        return self._select_stream(_command)
@@ -1,14 +1,13 @@
-import asyncio
+import functools
 import logging
-import os
-import pickle
 from datetime import datetime
 
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-
+from databases.DbExecutor import run_db
 from databases.repository.GoogleAgencyRp import GoogleAgencyRp
+from domain.sheets.metadata_cache import metadata_cache
+from domain.sheets.service_provider import sheets_provider
+from domain.sheets.stream_writer import write_streaming
+from domain.sheets.write_planner import SpreadsheetWritePlan
 from private_cfg import SPREADSHEET_GOOGLE_AGENCY_ID2
 
 # Logging
@@ -16,44 +15,16 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 
 class GoogleSheetUploaderLimited:
     def __init__(self):
-        self.SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
-        self.TOKEN_FILENAME = 'token.pickle'
-        self.CREDS_FILENAME = 'credential.json'
         self.SPREADSHEET_ID = SPREADSHEET_GOOGLE_AGENCY_ID2
-        self.request_count = 0
-
-    async def time_limiter_count(self):
-        self.request_count += 1
-        if self.request_count % 5 == 0:
-            logging.info(f"Request limit reached ({self.request_count}). Sleeping for 10 seconds.")
-            await asyncio.sleep(10)
-
-    def authenticate(self):
-        creds = None
-        if os.path.exists(self.TOKEN_FILENAME):
-            with open(self.TOKEN_FILENAME, 'rb') as token:
-                creds = pickle.load(token)
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                flow = InstalledAppFlow.from_client_secrets_file(self.CREDS_FILENAME, self.SCOPES)
-                creds = flow.run_local_server(port=0)
-            with open(self.TOKEN_FILENAME, 'wb') as token:
-                pickle.dump(creds, token)
-        return creds
+        # Очищення, дані і форматування всіх вкладок йдуть у таблицю трьома запитами
+        self.plan = SpreadsheetWritePlan(self.SPREADSHEET_ID)
 
     async def clear_sheet(self, sheet_name='Sheet1'):
-        service = build('sheets', 'v4', credentials=self.authenticate())
-        service.spreadsheets().values().clear(
-            spreadsheetId=self.SPREADSHEET_ID,
-            range=sheet_name,
-            body={}
-        ).execute()
-        await self.time_limiter_count()
+        self.plan.clear(sheet_name)
 
     async def upload_data(self, data, headers, sheet_name='Sheet1'):
-        service = build('sheets', 'v4', credentials=self.authenticate())
+        # sheetId — до того, як у план щось потрапить: відсутня вкладка не зачепить інші при flush
+        sheet_id = await self.get_sheet_id(sheet_name)
         now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
         values = [
@@ -63,54 +34,44 @@ class GoogleSheetUploaderLimited:
                      [row.get(header, '') for header in headers] for row in data
                  ]
 
-        service.spreadsheets().values().update(
-            spreadsheetId=self.SPREADSHEET_ID,
-            range=f"{sheet_name}!A1",
-            valueInputOption="RAW",
-            body={"values": values}
-        ).execute()
-        await self.time_limiter_count()
+        await self.clear_sheet(sheet_name)
+        self.plan.write(f"{sheet_name}!A1", values)
+        self.plan.format(self.bold_headers_request(sheet_id, len(headers)))
+
+    async def get_sheet_id(self, sheet_name):
+        return await metadata_cache.get_sheet_id(sheets_provider.service(), self.SPREADSHEET_ID, sheet_name)
 
+    @staticmethod
+    def bold_headers_request(sheet_id, column_count):
         # Formatting headers bold
-        sheet_metadata = service.spreadsheets().get(spreadsheetId=self.SPREADSHEET_ID).execute()
-        sheet_id_list = [s['properties']['sheetId'] for s in sheet_metadata['sheets'] if
-                         s['properties']['title'] == sheet_name]
-        if not sheet_id_list:
-            raise ValueError(f"Sheet '{sheet_name}' not found.")
-        sheet_id = sheet_id_list[0]
-
-        body = {
-            'requests': [
-                {
-                    'repeatCell': {
-                        'range': {
-                            'sheetId': sheet_id,
-                            'startRowIndex': 1,
-                            'endRowIndex': 2,
-                            'startColumnIndex': 0,
-                            'endColumnIndex': len(headers)
-                        },
-                        'cell': {
-                            'userEnteredFormat': {
-                                'textFormat': {
-                                    'bold': True
-                                }
-                            }
-                        },
-                        'fields': 'userEnteredFormat.textFormat.bold'
+        return {
+            'repeatCell': {
+                'range': {
+                    'sheetId': sheet_id,
+                    'startRowIndex': 1,
+                    'endRowIndex': 2,
+                    'startColumnIndex': 0,
+                    'endColumnIndex': column_count
+                },
+                'cell': {
+                    'userEnteredFormat': {
+                        'textFormat': {
+                            'bold': True
+                        }
                     }
-                }
-            ]
+                },
+                'fields': 'userEnteredFormat.textFormat.bold'
+            }
         }
 
-        service.spreadsheets().batchUpdate(
-            spreadsheetId=self.SPREADSHEET_ID,
-            body=body
-        ).execute()
-        await self.time_limiter_count()
+    async def flush(self):
+        await self.plan.flush()
 
-    async def process_and_upload_mcc_transactions(self, sheet_name='Sheet1'):
-        mcc_transactions = GoogleAgencyRp().get_mcc_transactions()
+    async def process_and_upload_mcc_transactions(self, sheet_name='Sheet1', flush=True):
+        mcc_transactions = await run_db(GoogleAgencyRp().get_mcc_transactions_incremental)
+        # None — помилка запиту, лист не очищуємо
+        if mcc_transactions is None:
+            raise RuntimeError("MCC transactions fetch failed")
         processed_data = []
 
         for mcc_transaction in mcc_transactions:
@@ -128,41 +89,53 @@ class GoogleSheetUploaderLimited:
 
         headers = ['ID', 'Team', 'Date', 'Amount']
 
-        await self.clear_sheet(sheet_name)
         await self.upload_data(processed_data, headers, sheet_name)
+        if flush:
+            await self.flush()
         logging.info(f"MCC transactions uploaded: sheet={sheet_name}, records={len(processed_data)}")
 
-    async def process_and_upload_accounts_transactions(self, sheet_name='Sheet1'):
-        account_transactions = GoogleAgencyRp().get_account_transactions()
-        processed_data = []
+    async def process_and_upload_accounts_transactions(self, sheet_name='Sheet1', flush=True):
+        headers = ['ID', 'Team', 'Email', 'Customer ID', 'Date', 'Amount']
+        sheet_id = await self.get_sheet_id(sheet_name)
 
+        # транзакції вже з'єднані з sub_accounts і читаються серверним курсором: у пам'яті один блок.
+        # Помилка запиту падає до очищення вкладки, тож старі дані лишаються
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        records = await write_streaming(
+            GoogleAgencyRp().iter_account_transactions_with_accounts(), f"{sheet_name}!A1", self.SPREADSHEET_ID,
+            [f"Updated: {now}"], formatter=functools.partial(self.iter_account_transaction_values, headers=headers))
+
+        # жирний заголовок іде в таблицю разом з рештою вкладок
+        self.plan.format(self.bold_headers_request(sheet_id, len(headers)))
+        if flush:
+            await self.flush()
+        logging.info(f"Account transactions uploaded: sheet={sheet_name}, records={records}")
+
+    @staticmethod
+    def iter_account_transaction_values(account_transactions, headers):
+        yield headers
         for account_transaction in account_transactions:
-            account = GoogleAgencyRp().get_account_by_uid(account_transaction.get("sub_account_uid")) or {}
-
             transaction_id = account_transaction.get("id") or "None"
             team_name = account_transaction.get("team_name") or "None"
-            account_email = account.get("account_email") or "None"
-            account_customer_id = account.get("customer_id") or "None"
+            account_email = account_transaction.get("sub_account_email") or "None"
+            account_customer_id = account_transaction.get("sub_account_customer_id") or "None"
             created_at = account_transaction.get('created')
             amount = account_transaction.get('value')
 
-            processed_data.append({
-                'ID': transaction_id,
-                'Team': team_name,
-                'Email': account_email,
-                'Customer ID': account_customer_id,
-                'Date': created_at.strftime('%Y-%m-%d %H:%M') if isinstance(created_at, datetime) else created_at,
-                'Amount': float(amount),
-            })
-
-        headers = ['ID', 'Team', 'Email', 'Customer ID', 'Date', 'Amount']
-
-        await self.clear_sheet(sheet_name)
-        await self.upload_data(processed_data, headers, sheet_name)
-        logging.info(f"Account transactions uploaded: sheet={sheet_name}, records={len(processed_data)}")
+            yield [
+                transaction_id,
+                team_name,
+                account_email,
+                account_customer_id,
+                created_at.strftime('%Y-%m-%d %H:%M') if isinstance(created_at, datetime) else created_at,
+                float(amount),
+            ]
 
-    async def process_and_upload_refunds(self, sheet_name='Sheet1'):
-        refunds = GoogleAgencyRp().get_refunded_accounts()
+    async def process_and_upload_refunds(self, sheet_name='Sheet1', flush=True):
+        refunds = await run_db(GoogleAgencyRp().get_refunded_accounts)
+        # None — помилка запиту, лист не очищуємо
+        if refunds is None:
+            raise RuntimeError("Refunded accounts fetch failed")
         processed_data = []
 
         for refund in refunds:
@@ -184,6 +157,7 @@ class GoogleSheetUploaderLimited:
 
         headers = ['Team', 'Email', 'Customer ID', 'Date', 'Refund Amount', 'Commission']
 
-        await self.clear_sheet(sheet_name)
         await self.upload_data(processed_data, headers, sheet_name)
+        if flush:
+            await self.flush()
         logging.info(f"Refunds uploaded: sheet={sheet_name}, records={len(processed_data)}")
@@ -1,71 +1,57 @@
 import asyncio
+import glob
 import json
 import logging
 import os
-import pickle
-import time
 from _decimal import Decimal
 from datetime import datetime
-from functools import lru_cache
 
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from tqdm import tqdm
 
-from YeezyAPI import YeezyAPI
+from AsyncYeezyAPI import AsyncYeezyAPI
+from YeezyAccountCache import YeezyAccountCache
+from databases.DbExecutor import run_db
 from databases.repository.GoogleAgencyRp import GoogleAgencyRp
+from domain.sheets.extent_store import extent_store
+from domain.sheets.metadata_cache import metadata_cache
+from domain.sheets.rate_limiter import sheets_limiter
+from domain.sheets.row_formatter import RowFormatter
+from domain.sheets.service_provider import sheets_provider
+from domain.transform_executor import transform_executor
 from private_cfg import MCC_ID, MCC_TOKEN, SPREADSHEET_GOOGLE_AGENCY_ID
 
 # Настроим логирование
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Рядок, з якого починається таблиця (заголовок), формули над нею
+DATA_START_ROW = 4
+CLEAR_COLUMNS = 10
+# Скільки порожніх рядків лишати під даними при стисканні сітки
+GRID_SPARE_ROWS = 100
+# Скільки останніх дампів temp/data_*.json зберігати
+DATA_DUMPS_KEEP = 10
+
 
 class GoogleSheetAPI:
     def __init__(self):
-        self.request_count = 0
-        self.last_request_time = time.time()
-        self.SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
-        self.TOKEN_FILENAME = 'token.pickle'
-        self.CREDS_FILENAME = 'credential.json'
         self.SPREADSHEET_ID = SPREADSHEET_GOOGLE_AGENCY_ID
 
-    async def time_limiter_count(self):
-        self.request_count += 1
-        if self.request_count % 5 == 0:  # Чекаємо кожні 5 запитів
-            await asyncio.sleep(10)  # Чекаємо 10 секунд
-
-    def authenticate(self):
-        creds = None
-        if os.path.exists(self.TOKEN_FILENAME):
-            with open(self.TOKEN_FILENAME, 'rb') as token:
-                creds = pickle.load(token)
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                flow = InstalledAppFlow.from_client_secrets_file(self.CREDS_FILENAME, self.SCOPES)
-                creds = flow.run_local_server(port=0)
-            # Збереження нового токена в файл
-            with open(self.TOKEN_FILENAME, 'wb') as token:
-                pickle.dump(creds, token)
-        return creds
-
     async def get_sheets(self, service):
-        sheets_metadata = service.spreadsheets().get(spreadsheetId=self.SPREADSHEET_ID).execute()
-        await self.time_limiter_count()
-        return {sheet['properties']['title']: sheet['properties']['sheetId'] for sheet in
-                sheets_metadata.get('sheets', [])}
+        sheets = await metadata_cache.get_sheets(service, self.SPREADSHEET_ID)
+        return {title: properties['sheetId'] for title, properties in sheets.items()}
 
     async def create_sheet(self, sheet_name, service):
         body = {"requests": [{"addSheet": {"properties": {"title": sheet_name}}}]}
-        response = service.spreadsheets().batchUpdate(spreadsheetId=self.SPREADSHEET_ID, body=body).execute()
-        await self.time_limiter_count()
-        return response["replies"][0]["addSheet"]["properties"]["sheetId"]
-
-    async def update_sheet(self, teams_data):
-        creds = self.authenticate()
-        service = build('sheets', 'v4', credentials=creds)
+        # лист з такою назвою могли додати вручну
+        with metadata_cache.invalidating(self.SPREADSHEET_ID):
+            response = await sheets_limiter.execute(
+                service.spreadsheets().batchUpdate(spreadsheetId=self.SPREADSHEET_ID, body=body))
+        properties = response["replies"][0]["addSheet"]["properties"]
+        metadata_cache.sheet_added(self.SPREADSHEET_ID, properties)
+        return properties["sheetId"]
+
+    async def update_sheet(self, teams_data, shrink_grid=True):
+        service = sheets_provider.service()
         existing_sheets = await self.get_sheets(service)
 
         updates = []
@@ -78,38 +64,64 @@ class GoogleSheetAPI:
 
             sheet_id = existing_sheets.get(sheet_name) or await self.create_sheet(sheet_name, service)
 
-            batch_clear_and_formulas.extend(self.create_clear_and_formulas_requests(sheet_name, sheet_id))
+            batch_clear_and_formulas.extend(
+                self.create_clear_and_formulas_requests(sheet_name, sheet_id, row_count, shrink_grid))
 
-            values = self.format_data_for_sheets(team_data['data'])
+            # значення і форматування великих команд будуються в пулі потоків
+            values, team_formatting = await transform_executor.run(
+                self.build_team_payload, team_data, sheet_id, size=row_count)
             updates.append({
                 "range": f'{sheet_name}!A5',
                 "values": values
             })
-            formatting_requests.extend(self.create_formatting_requests(sheet_id, row_count, team_data['data']))
+            formatting_requests.extend(team_formatting)
 
-        # Виконуємо batchUpdate для очищення і формул
-        if batch_clear_and_formulas:
-            await self.batch_update_clear_and_formulas(batch_clear_and_formulas, service)
+        # sheetId і межі сітки в запитах взяті з metadata_cache
+        with metadata_cache.invalidating(self.SPREADSHEET_ID):
+            # Виконуємо batchUpdate для очищення і формул
+            if batch_clear_and_formulas:
+                await self.batch_update_clear_and_formulas(batch_clear_and_formulas, service)
 
-        # Виконуємо batchUpdate для запису значень
-        if updates:
-            await self.batch_update_sheets(updates, service)
+            # Виконуємо batchUpdate для запису значень
+            if updates:
+                # якщо запис впаде посередині, наступний прогін все одно очистить усе записане
+                self.reserve_extents(teams_data)
+                await self.batch_update_sheets(updates, service)
 
-        # Виконуємо batchUpdate для форматування
-        if formatting_requests:
-            await self.batch_update_formatting(formatting_requests, service)
+            # Виконуємо batchUpdate для форматування
+            if formatting_requests:
+                await self.batch_update_formatting(formatting_requests, service)
 
+        self.save_extents(teams_data, shrink_grid)
         logging.info(f"Updated {len(teams_data)} sheets at {datetime.now().strftime('%Y-%m-%d %H:%M')}")
 
-    def create_clear_and_formulas_requests(self, sheet_name, sheet_id):
-        return [
-            # очищенння
+    def build_team_payload(self, team_data, sheet_id):
+        """Значення і запити форматування одного листа; без I/O, тож може виконуватись поза loop."""
+        values = self.format_data_for_sheets(team_data['data'])
+        return values, self.create_formatting_requests(sheet_id, len(team_data['data']), team_data['data'])
+
+    def clear_extent(self, sheet_name):
+        """
+        Скільки рядків листа зайнято попереднім записом: збережена кількість,
+        інакше rowCount із закешованих gridProperties, інакше стара межа в 1000 рядків.
+        """
+        grid_rows = metadata_cache.grid_row_count(self.SPREADSHEET_ID, sheet_name)
+        written_rows = extent_store.get(self.SPREADSHEET_ID, sheet_name)
+        extent = written_rows if written_rows is not None else grid_rows or 1000
+        # updateCells за межами сітки повертає помилку
+        return min(extent, grid_rows) if grid_rows else extent
+
+    def create_clear_and_formulas_requests(self, sheet_name, sheet_id, row_count, shrink_grid=False):
+        # заголовок + row_count рядків даних з DATA_START_ROW
+        used_rows = DATA_START_ROW + 1 + row_count
+        requests = [
+            # очищення всього, що записали минулого разу; рядки нижче і так порожні
             {
                 "updateCells": {
                     "range": {
                         "sheetId": sheet_id,
-                        "startRowIndex": 0, "endRowIndex": 1000,  # Очищаємо до 1000 рядків
-                        "startColumnIndex": 0, "endColumnIndex": 10  # Очищаємо до 10 колонок
+                        "startRowIndex": 0, "endRowIndex": self.clear_extent(sheet_name),
+                        "startColumnIndex": 0, "endColumnIndex": CLEAR_COLUMNS
                     },
                     "fields": "userEnteredValue, userEnteredFormat, textFormatRuns, dataValidation"
                 }
@@ -144,51 +156,76 @@ class GoogleSheetAPI:
             }
         ]
 
+        grid_rows = metadata_cache.grid_row_count(self.SPREADSHEET_ID, sheet_name)
+        keep_rows = used_rows + GRID_SPARE_ROWS
+        if shrink_grid and grid_rows and grid_rows > keep_rows:
+            # Зайві порожні рядки сповільнюють перерахунок формул на кшталт SUM(F6:F)
+            requests.append({
+                "deleteDimension": {
+                    "range": {"sheetId": sheet_id, "dimension": "ROWS", "startIndex": keep_rows,
+                              "endIndex": grid_rows}
+                }
+            })
+        return requests
+
+    def reserve_extents(self, teams_data):
+        """Перед записом значень зберігає більшу з меж: попередню або ту, що буде записана."""
+        for team_data in teams_data:
+            sheet_name = team_data['team_name']
+            used_rows = DATA_START_ROW + 1 + len(team_data['data'])
+            previous_rows = extent_store.get(self.SPREADSHEET_ID, sheet_name) or 0
+            extent_store.set(self.SPREADSHEET_ID, sheet_name, max(previous_rows, used_rows))
+        extent_store.save()
+
+    def save_extents(self, teams_data, shrink_grid=False):
+        """Після успішного запису зберігає зайняті рядки і новий розмір сітки кожного листа."""
+        for team_data in teams_data:
+            sheet_name = team_data['team_name']
+            used_rows = DATA_START_ROW + 1 + len(team_data['data'])
+            extent_store.set(self.SPREADSHEET_ID, sheet_name, used_rows)
+
+            grid_rows = metadata_cache.grid_row_count(self.SPREADSHEET_ID, sheet_name)
+            if not grid_rows:
+                continue
+            if shrink_grid and grid_rows > used_rows + GRID_SPARE_ROWS:
+                metadata_cache.grid_resized(self.SPREADSHEET_ID, sheet_name, used_rows + GRID_SPARE_ROWS)
+            elif grid_rows < used_rows:
+                # values.update сам дописує рядки, якщо даних більше ніж сітка
+                metadata_cache.grid_resized(self.SPREADSHEET_ID, sheet_name, used_rows)
+        extent_store.save()
+
     async def batch_update_sheets(self, updates, service):
         batch_data = {"valueInputOption": "RAW", "data": updates}
-        service.spreadsheets().values().batchUpdate(
-            spreadsheetId=self.SPREADSHEET_ID, body=batch_data).execute()
-        await self.time_limiter_count()
+        await sheets_limiter.execute(service.spreadsheets().values().batchUpdate(
+            spreadsheetId=self.SPREADSHEET_ID, body=batch_data))
 
     async def batch_update_formatting(self, requests, service):
-        service.spreadsheets().batchUpdate(
-            spreadsheetId=self.SPREADSHEET_ID, body={'requests': requests}).execute()
-        await self.time_limiter_count()
+        await sheets_limiter.execute(service.spreadsheets().batchUpdate(
+            spreadsheetId=self.SPREADSHEET_ID, body={'requests': requests}))
 
     async def batch_update_clear_and_formulas(self, requests, service):
-        service.spreadsheets().batchUpdate(
-            spreadsheetId=self.SPREADSHEET_ID, body={'requests': requests}).execute()
-        await self.time_limiter_count()
+        await sheets_limiter.execute(service.spreadsheets().batchUpdate(
+            spreadsheetId=self.SPREADSHEET_ID, body={'requests': requests}))
 
     async def clear_page(self, sheet_name, table_id, service):
-        service.spreadsheets().values().clear(
+        await sheets_limiter.execute(service.spreadsheets().values().clear(
             spreadsheetId=table_id,
             range=f"{sheet_name}!A1:Z",
             body={}
-        ).execute()
-        await self.time_limiter_count()
+        ))
 
     def format_data_for_sheets(self, data):
         if not data:
             return []
 
         headers = ['ID', 'MCC', 'DATE', 'EMAIL', 'AMOUNT', 'SPEND', 'REFUND', 'CURRENT STATUS']
-        formatted_data = [headers]
-
-        for row in data:
-            formatted_data.append([
-                row.get('ID', ''),
-                row.get('MCC', ''),
-                row.get('DATE', '').strftime("%Y-%m-%d") if isinstance(row.get('DATE'), datetime) else row.get('DATE',
-                                                                                                               ''),
-                row.get('EMAIL', ''),
-                float(row.get('AMOUNT', 0)) if isinstance(row.get('AMOUNT'), Decimal) else row.get('AMOUNT', 0),
-                float(row.get('SPEND', 0)) if isinstance(row.get('SPEND'), Decimal) else row.get('SPEND', 0),
-                float(row.get('REFUND', 0)) if isinstance(row.get('REFUND'), Decimal) else row.get('REFUND', 0),
-                row.get('CURRENT STATUS', '')
-            ])
-
-        return formatted_data
+        formatter = RowFormatter(
+            headers,
+            datetime_format="%Y-%m-%d",
+            defaults={'ID': '', 'MCC': '', 'DATE': '', 'EMAIL': '', 'AMOUNT': 0, 'SPEND': 0, 'REFUND': 0,
+                      'CURRENT STATUS': ''}
+        )
+        return [headers] + formatter.format(data)
 
     async def add_formulas(self, sheet_name, service):
         values = [
@@ -197,13 +234,12 @@ class GoogleSheetAPI:
             ["Accounts:", "=SUMPRODUCT((MONTH(C6:C)=MONTH(TODAY()))*(YEAR(C6:C)=YEAR(TODAY())))"]
         ]
 
-        service.spreadsheets().values().update(
+        await sheets_limiter.execute(service.spreadsheets().values().update(
             spreadsheetId=self.SPREADSHEET_ID,
             range=f"{sheet_name}!A1:B4",
             valueInputOption="USER_ENTERED",
             body={"values": values}
-        ).execute()
-        await self.time_limiter_count()
+        ))
 
     def create_formatting_requests(self, sheet_id, row_count, data):
         requests = [
@@ -229,86 +265,144 @@ class GoogleSheetAPI:
             }
         ]
 
-        for i, row in enumerate(data):
-            color = {'red': 1, 'green': 0.8, 'blue': 0.8} if row.get('REFUND') not in [None] or row.get(
-                'CURRENT STATUS') in ('INACTIVE', 'CLOSED', 'FORCE_CLOSED') else {'red': 1, 'green': 1, 'blue': 1}
-
-            requests.append({
-                'repeatCell': {
-                    'range': {
-                        'sheetId': sheet_id,
-                        'startRowIndex': 5 + i,
-                        'endRowIndex': 6 + i,
-                        'startColumnIndex': 0,
-                        'endColumnIndex': 8
-                    },
-                    'cell': {
-                        'userEnteredFormat': {'backgroundColor': color}
-                    },
-                    'fields': 'userEnteredFormat.backgroundColor'
-                }
-            })
+        # Весь блок даних фарбуємо білим одним запитом, а червоним — тільки суцільні відрізки рядків
+        if row_count:
+            requests.append(self.background_request(sheet_id, 5, 5 + row_count, {'red': 1, 'green': 1, 'blue': 1}))
+
+        run_start = None
+        for i, row in enumerate(data + [None]):
+            highlighted = row is not None and (row.get('REFUND') not in [None] or row.get(
+                'CURRENT STATUS') in ('INACTIVE', 'CLOSED', 'FORCE_CLOSED'))
+            if highlighted and run_start is None:
+                run_start = i
+            elif not highlighted and run_start is not None:
+                requests.append(self.background_request(sheet_id, 5 + run_start, 5 + i,
+                                                        {'red': 1, 'green': 0.8, 'blue': 0.8}))
+                run_start = None
 
         return requests
 
     @staticmethod
-    @lru_cache(maxsize=None)
-    def get_mcc_by_uuid_cached(mcc_uuid):
-        return GoogleAgencyRp().get_mcc_by_uuid(mcc_uuid) or {}
+    def background_request(sheet_id, start_row, end_row, color):
+        return {
+            'repeatCell': {
+                'range': {
+                    'sheetId': sheet_id,
+                    'startRowIndex': start_row,
+                    'endRowIndex': end_row,
+                    'startColumnIndex': 0,
+                    'endColumnIndex': 8
+                },
+                'cell': {
+                    'userEnteredFormat': {'backgroundColor': color}
+                },
+                'fields': 'userEnteredFormat.backgroundColor'
+            }
+        }
+
+    @staticmethod
+    def index_by(rows, key):
+        index = {}
+        for row in rows:
+            index.setdefault(row.get(key), row)
+        return index
+
+    def load_join_indexes(self, refunded):
+        """
+        Загружает sub_accounts и mcc одним запросом каждую и индексирует их в памяти.
+        """
+        all_accounts = GoogleAgencyRp().get_all_accounts()
+        all_mcc = GoogleAgencyRp().get_all_mcc()
+        if all_accounts is None or all_mcc is None:
+            return None
+
+        return {
+            'accounts': self.index_by(all_accounts, 'account_uid'),
+            'refunds': self.index_by(refunded, 'account_uid'),
+            'mcc': self.index_by(all_mcc, 'mcc_uuid'),
+        }
+
+    @staticmethod
+    def lookup_transaction_rows(transaction):
+        """
+        Точечные запросы MCC, рефанда и аккаунта одной транзакции, когда индексы не загрузились.
+        """
+        repository = GoogleAgencyRp()
+        mcc = repository.get_mcc_by_uuid(transaction['mcc_uuid']) or {}
+        ref_account = repository.get_refunded_account_by_uid(transaction['sub_account_uid'])
+        account = repository.get_account_by_uid(transaction['sub_account_uid']) or {}
+        return mcc, ref_account, account
 
-    def process_transactions(self, sub_transactions, refunded, accounts):
+    async def verify_accounts(self, account_uids, use_cache=True):
+        """
+        Проверяет аккаунты через API пачками, возвращает {uid: account}.
+        С use_cache в API идут только аккаунты без свежей записи в YeezyAccountCache.
         """
-        Обрабатывает данные из двух списков, объединяя их в нужный формат.
+        cache = YeezyAccountCache() if use_cache else None
+        try:
+            if cache:
+                api_accounts, account_uids = cache.get_many(account_uids)
+                cache.log_stats()
+            else:
+                api_accounts = {}
+            if not account_uids:
+                return api_accounts
+
+            verified = {}
+            async with AsyncYeezyAPI() as yeezy:
+                # Авторизация MCC API
+                auth = await yeezy.generate_auth(MCC_ID, MCC_TOKEN)
+                if not auth:
+                    # без авторизации нельзя отличить пустую команду от ошибки — листы не трогаем
+                    raise RuntimeError(f"Ошибка авторизации MCC: {MCC_ID}")
+
+                with tqdm(total=len(account_uids), desc="Проверка аккаунтов", unit="аккаунт") as pbar:
+                    async for account_uid, account in yeezy.verify_accounts(auth['token'], account_uids):
+                        verified[account_uid] = account
+                        pbar.update(1)
+
+            if cache:
+                cache.put_many(verified)
+            api_accounts.update(verified)
+            return api_accounts
+        finally:
+            if cache:
+                cache.close()
+
+    async def process_transactions(self, unique_result, refunded, bulk_join=True):
+        """
+        Обрабатывает уникальные аккаунты (GoogleAgencyRp.get_distinct_accounts), объединяя их в нужный формат.
+        В режиме bulk_join аккаунты, рефанды и MCC берутся из индексов в памяти, а не точечными запросами.
         """
         team_data = {}
 
-        logging.info(
-            f"Начинаем обработку транзакций. Получено {len(sub_transactions)} sub_transactions, {len(refunded)} refunded, {len(accounts)} accounts")
+        indexes = await run_db(self.load_join_indexes, refunded) if bulk_join else None
+        if bulk_join and indexes is None:
+            logging.error("Не удалось загрузить индексы, переходим на точечные запросы")
 
-        # Авторизация MCC API
-        auth = YeezyAPI().generate_auth(MCC_ID, MCC_TOKEN)
-        if not auth:
-            logging.error(f"Ошибка авторизации MCC: {MCC_ID}")
+        logging.info(
+            f"Начинаем обработку транзакций. Унікальних акаунтів {len(unique_result)}, {len(refunded)} refunded")
 
-        unique_accounts = [
-            (acc['account_uid'], acc['mcc_uuid'], acc['team_name'])
-            for acc in accounts
-        ]
-        unique_transactions = [
-            (transaction['sub_account_uid'], transaction['mcc_uuid'], transaction['team_name'])
-            for transaction in sub_transactions
-        ]
-        unique_refunds = [
-            (refund['account_uid'], refund['mcc_uuid'], refund['team_name'])
-            for refund in refunded
-        ]
-        unique_accounts = set(unique_transactions + unique_refunds + unique_accounts)
-        unique_result = [
-            {"sub_account_uid": account[0], "mcc_uuid": account[1], "team_name": account[2]}
-            for account in unique_accounts
-        ]
-        logging.info(f"Унікальних акаунтів {len(unique_result)}")
+        api_accounts = await self.verify_accounts({account['sub_account_uid'] for account in unique_result})
 
         with tqdm(total=len(unique_result), desc="Обработка transactions", unit="транзакция") as pbar:
             for transaction in unique_result:
                 team_name = transaction['team_name']
 
-                if team_name not in team_data:
-                    team_data[team_name] = []
-
                 # Получаем данные об аккаунте из API
-                account_api_response = YeezyAPI().get_verify_account(auth['token'], transaction['sub_account_uid'])
-                if not account_api_response:
+                account_api = api_accounts.get(transaction['sub_account_uid'])
+                if not account_api:
                     logging.error(f"❌ Не удалось получить данные аккаунта {transaction['sub_account_uid']} из API")
                     pbar.update(1)
                     continue
 
-                account_api = account_api_response.get('accounts', [{}])[0]
-
-                mcc = self.get_mcc_by_uuid_cached(transaction['mcc_uuid'])
-                ref_account = GoogleAgencyRp().get_refunded_account_by_uid(transaction['sub_account_uid'])
+                if indexes:
+                    mcc = indexes['mcc'].get(transaction['mcc_uuid']) or {}
+                    ref_account = indexes['refunds'].get(transaction['sub_account_uid'])
+                    account = indexes['accounts'].get(transaction['sub_account_uid']) or {}
+                else:
+                    mcc, ref_account, account = await run_db(self.lookup_transaction_rows, transaction)
                 refund_value = ref_account.get('refund_value', 0) if ref_account else None
-                account = GoogleAgencyRp().get_account_by_uid(transaction['sub_account_uid']) or {}
 
                 if account and account_api['status'] not in ('INACTIVE', 'CLOSED', 'FORCE_CLOSED'):
                     date_created = account.get('created', None)
@@ -333,7 +427,8 @@ class GoogleSheetAPI:
                     'CURRENT STATUS': account_api['status']
                 }
 
-                team_data[team_name].append(formatted_entry)
+                # команда попадает в результат только с проверенными аккаунтами, иначе её лист очистится
+                team_data.setdefault(team_name, []).append(formatted_entry)
                 pbar.update(1)
 
         logging.info(f"Готово! Обработано {len(team_data)} команд.")
@@ -341,18 +436,19 @@ class GoogleSheetAPI:
 
 
 async def start_google_analitics():
-    sub_transactions = GoogleAgencyRp().get_account_transactions()
-    refunded = GoogleAgencyRp().get_refunded_accounts()
-    accounts = GoogleAgencyRp().get_accounts_with_team()
+    # незалежні вибірки паралельно в пулі потоків БД; унікальні акаунти рахує MySQL
+    unique_accounts, refunded = await asyncio.gather(
+        run_db(GoogleAgencyRp().get_distinct_accounts),
+        run_db(GoogleAgencyRp().get_refunded_accounts),
+    )
 
-    formatted_data = GoogleSheetAPI().process_transactions(sub_transactions, refunded, accounts)
-    for team in formatted_data:
-        team['data'].sort(
-            key=lambda x: x['DATE'] if x['DATE'] else datetime.min,
-            reverse=True
-        )
+    formatted_data = await GoogleSheetAPI().process_transactions(unique_accounts, refunded)
+    await transform_executor.run(
+        sort_teams_by_date, formatted_data, size=sum(len(team['data']) for team in formatted_data))
 
     save_list_to_file(formatted_data, f'temp/data_{datetime.now().strftime("%Y-%m-%d %H:%M")}.json')
+    # у режимі демона дамп пишеться кожен тік, старі видаляємо
+    prune_files('temp/data_*.json', DATA_DUMPS_KEEP)
 
     # data = load_list_from_file(f'temp/data_2025-30-01.json')
 
@@ -360,8 +456,25 @@ async def start_google_analitics():
     await sheet_api.update_sheet(formatted_data)
 
 
+def sort_teams_by_date(teams_data):
+    for team in teams_data:
+        team['data'].sort(
+            key=lambda x: x['DATE'] if x['DATE'] else datetime.min,
+            reverse=True
+        )
+
+
 # start_google_analitics()
 
+def prune_files(pattern, keep):
+    """Видаляє всі файли за шаблоном, крім keep найновіших (імена з датою сортуються хронологічно)."""
+    for filename in sorted(glob.glob(pattern))[:-keep]:
+        try:
+            os.remove(filename)
+        except OSError as e:
+            logging.warning(f"Could not remove old dump {filename}: {e}")
+
+
 def save_list_to_file(data_list, filename):
     """Сохраняет список в JSON (конвертируя datetime и Decimal в строку/число)."""
     try:
@@ -0,0 +1,35 @@
+import json
+import logging
+import os
+
+
+class SheetExtentStore:
+    """Пам'ятає, скільки рядків востаннє записали в кожен лист, щоб очищати тільки їх."""
+
+    def __init__(self, path='temp/sheet_extents.json'):
+        self.path = path
+        self._extents = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Broken sheet extents {self.path}: {e}")
+            return {}
+
+    def get(self, table_id, sheet_name):
+        return self._extents.get(table_id, {}).get(sheet_name)
+
+    def set(self, table_id, sheet_name, row_count):
+        self._extents.setdefault(table_id, {})[sheet_name] = row_count
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as file:
+            json.dump(self._extents, file, ensure_ascii=False)
+
+
+extent_store = SheetExtentStore()
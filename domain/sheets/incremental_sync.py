@@ -0,0 +1,188 @@
+import difflib
+import hashlib
+import json
+import logging
+import os
+import time
+
+from googleapiclient.errors import HttpError
+
+from domain.sheets.metadata_cache import metadata_cache
+from domain.sheets.rate_limiter import sheets_limiter
+
+# Рядок "last updated" + рядок заголовків над даними
+DATA_OFFSET = 2
+
+
+def row_hash(row):
+    return hashlib.blake2b(json.dumps(row, default=str, ensure_ascii=False).encode(), digest_size=8).hexdigest()
+
+
+def key_column_for(header):
+    return 'id' if 'id' in header else header[0]
+
+
+def snapshot_rows(values, key_column):
+    key_index = values[0].index(key_column)
+    return [[str(row[key_index]), row_hash(row)] for row in values[1:]]
+
+
+class SheetSnapshotStore:
+    """Зберігає хеші рядків, які востаннє записали в кожен діапазон."""
+
+    def __init__(self, directory='temp/sheet_snapshots', max_age=24 * 60 * 60):
+        self.directory = directory
+        self.max_age = max_age
+
+    def _path(self, table_id, sheet_name):
+        return os.path.join(self.directory, f"{table_id}_{sheet_name}.json".replace('/', '_'))
+
+    def load(self, table_id, sheet_name):
+        path = self._path(table_id, sheet_name)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                snapshot = json.load(file)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Broken snapshot {path}: {e}")
+            return None
+        # Раз на max_age повністю переписуємо лист, щоб прибрати ручні правки
+        if time.time() - snapshot.get('written_at', 0) > self.max_age:
+            return None
+        return snapshot
+
+    def save(self, table_id, sheet_name, values):
+        os.makedirs(self.directory, exist_ok=True)
+        key_column = key_column_for(values[0])
+        snapshot = {
+            'written_at': time.time(),
+            'header': values[0],
+            'key_column': key_column,
+            'rows': snapshot_rows(values, key_column),
+        }
+        with open(self._path(table_id, sheet_name), 'w', encoding='utf-8') as file:
+            json.dump(snapshot, file, ensure_ascii=False)
+
+    def drop(self, table_id, sheet_name):
+        path = self._path(table_id, sheet_name)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def plan_incremental_update(snapshot, values, max_dirty_ratio=0.5):
+    """
+    Порівнює новий набір рядків зі знімком попереднього запису.
+    Повертає (dimension_ops, dirty_rows) або None, якщо простіше переписати лист повністю.
+    """
+    if not snapshot or len(values) < 2 or snapshot['header'] != values[0]:
+        return None
+
+    old_rows = snapshot['rows']
+    new_rows = snapshot_rows(values, snapshot['key_column'])
+    matcher = difflib.SequenceMatcher(None, [key for key, _ in old_rows], [key for key, _ in new_rows],
+                                      autojunk=False)
+
+    dimension_ops = []  # (kind, old_index, count) у порядку зверху вниз
+    dirty_rows = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            dirty_rows.extend(j1 + k for k in range(i2 - i1) if old_rows[i1 + k][1] != new_rows[j1 + k][1])
+            continue
+
+        old_count, new_count = i2 - i1, j2 - j1
+        # Нові рядки в кінці таблиці просто дописуємо, зсувати нічого не треба
+        if new_count > old_count and i2 < len(old_rows):
+            dimension_ops.append(('insert', i2, new_count - old_count))
+        elif new_count < old_count:
+            dimension_ops.append(('delete', i1 + new_count, old_count - new_count))
+        dirty_rows.extend(range(j1, j2))
+
+    if len(dirty_rows) > max_dirty_ratio * len(new_rows):
+        return None
+    return dimension_ops, dirty_rows
+
+
+def dimension_requests(sheet_id, dimension_ops):
+    requests = []
+    # знизу вгору, щоб індекси вище не зсувались
+    for kind, index, count in reversed(dimension_ops):
+        start = DATA_OFFSET + index
+        dimension_range = {'sheetId': sheet_id, 'dimension': 'ROWS', 'startIndex': start, 'endIndex': start + count}
+        if kind == 'insert':
+            requests.append({'insertDimension': {'range': dimension_range, 'inheritFromBefore': start > DATA_OFFSET}})
+        else:
+            requests.append({'deleteDimension': {'range': dimension_range}})
+    return requests
+
+
+def dirty_value_ranges(sheet_name, values, dirty_rows):
+    ranges = []
+    block = []
+    for row_index in sorted(dirty_rows):
+        if block and row_index != block[-1] + 1:
+            ranges.append(block)
+            block = []
+        block.append(row_index)
+    if block:
+        ranges.append(block)
+
+    return [
+        {
+            # null у values.batchUpdate пропускає клітинку, тому пишемо порожній рядок
+            'range': f"'{sheet_name}'!A{DATA_OFFSET + block[0] + 1}",
+            'values': [['' if value is None else value for value in values[1 + row_index]] for row_index in block]
+        }
+        for block in ranges
+    ]
+
+
+async def write_incremental(service, values, stamp_row, range_name, table_id, store, write_plan=None):
+    """
+    Записує тільки змінені рядки. Повертає False, якщо потрібен повний перезапис.
+    З write_plan запити додаються в SpreadsheetWritePlan і йдуть разом з іншими листами таблиці.
+    """
+    sheet_name = range_name.split('!')[0]
+    plan = plan_incremental_update(store.load(table_id, sheet_name), values)
+    if plan is None:
+        return False
+    dimension_ops, dirty_rows = plan
+
+    if write_plan is not None:
+        if dimension_ops:
+            sheet_id = await metadata_cache.get_sheet_id(service, table_id, sheet_name)
+            write_plan.format(*dimension_requests(sheet_id, dimension_ops))
+        write_plan.write(f"'{sheet_name}'!A1", [stamp_row])
+        for value_range in dirty_value_ranges(sheet_name, values, dirty_rows):
+            write_plan.write(value_range['range'], value_range['values'])
+        # до успішного flush знімок недійсний
+        store.drop(table_id, sheet_name)
+        write_plan.on_success(lambda: store.save(table_id, sheet_name, values))
+        print(f"{range_name} | Incremental update queued: {len(dirty_rows)} rows, {len(dimension_ops)} row shifts")
+        return True
+
+    try:
+        if dimension_ops:
+            sheet_id = await metadata_cache.get_sheet_id(service, table_id, sheet_name)
+            with metadata_cache.invalidating(table_id):
+                await sheets_limiter.execute(service.spreadsheets().batchUpdate(
+                    spreadsheetId=table_id,
+                    body={'requests': dimension_requests(sheet_id, dimension_ops)}
+                ))
+
+        data = [{'range': f"'{sheet_name}'!A1", 'values': [stamp_row]}]
+        data.extend(dirty_value_ranges(sheet_name, values, dirty_rows))
+        await sheets_limiter.execute(service.spreadsheets().values().batchUpdate(
+            spreadsheetId=table_id,
+            body={'valueInputOption': 'RAW', 'data': data}
+        ))
+    except HttpError as e:
+        # після часткового запису знімок вже не відповідає листу
+        logging.error(f"{range_name} | incremental update failed, rewriting whole sheet: {e}")
+        store.drop(table_id, sheet_name)
+        return False
+
+    store.save(table_id, sheet_name, values)
+    print(f"{range_name} | Incremental update: {len(dirty_rows)} rows, {len(dimension_ops)} row shifts "
+          f"at {time.strftime('%Y-%m-%d %H:%M')}")
+    return True
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import logging
+import os
+from contextlib import contextmanager
+
+from googleapiclient.errors import HttpError
+
+from domain.sheets.rate_limiter import sheets_limiter
+
+
+class SpreadsheetMetadataCache:
+    """
+    Кеш властивостей листів (title -> sheets.properties) для кожної таблиці.
+    Оновлюється нашими ж addSheet і скидається, коли API відхиляє запит (invalidating);
+    persist_path зберігає його між запусками.
+    """
+
+    def __init__(self, persist_path=None):
+        self.persist_path = persist_path
+        self._sheets = self._load()
+        self._locks = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return {}
+        try:
+            with open(self.persist_path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Broken sheets metadata cache {self.persist_path}: {e}")
+            return {}
+
+    def _save(self):
+        if not self.persist_path:
+            return
+        os.makedirs(os.path.dirname(self.persist_path) or '.', exist_ok=True)
+        with open(self.persist_path, 'w', encoding='utf-8') as file:
+            json.dump(self._sheets, file, ensure_ascii=False)
+
+    async def get_sheets(self, service, spreadsheet_id):
+        lock = self._locks.setdefault(spreadsheet_id, asyncio.Lock())
+        async with lock:
+            if spreadsheet_id in self._sheets:
+                self.hits += 1
+            else:
+                self.misses += 1
+                metadata = await sheets_limiter.execute(
+                    service.spreadsheets().get(spreadsheetId=spreadsheet_id, fields='sheets.properties'), 'read')
+                self._sheets[spreadsheet_id] = {
+                    sheet['properties']['title']: sheet['properties'] for sheet in metadata.get('sheets', [])
+                }
+                self._save()
+            return self._sheets[spreadsheet_id]
+
+    async def get_sheet_id(self, service, spreadsheet_id, sheet_name):
+        properties = (await self.get_sheets(service, spreadsheet_id)).get(sheet_name)
+        if properties is None:
+            raise ValueError(f"Sheet '{sheet_name}' not found.")
+        return properties['sheetId']
+
+    def sheet_added(self, spreadsheet_id, properties):
+        if spreadsheet_id in self._sheets:
+            self._sheets[spreadsheet_id][properties['title']] = properties
+            self._save()
+
+    def grid_row_count(self, spreadsheet_id, sheet_name):
+        """rowCount з уже закешованих властивостей, без запиту до API."""
+        properties = self._sheets.get(spreadsheet_id, {}).get(sheet_name) or {}
+        return properties.get('gridProperties', {}).get('rowCount')
+
+    def grid_resized(self, spreadsheet_id, sheet_name, row_count):
+        properties = self._sheets.get(spreadsheet_id, {}).get(sheet_name)
+        if properties is not None:
+            properties.setdefault('gridProperties', {})['rowCount'] = row_count
+            self._save()
+
+    def invalidate(self, spreadsheet_id=None):
+        if spreadsheet_id is None:
+            self._sheets.clear()
+        else:
+            self._sheets.pop(spreadsheet_id, None)
+        self._save()
+
+    @contextmanager
+    def invalidating(self, spreadsheet_id):
+        """
+        Скидає кеш таблиці, якщо API відповів 400: лист могли видалити, перейменувати чи змінити
+        його сітку вручну, і закешовані sheetId/rowCount вже невірні. Наступний запуск перечитає їх.
+        """
+        try:
+            yield
+        except HttpError as e:
+            if e.resp.status == 400:
+                logging.warning(f"Sheets rejected a request for {spreadsheet_id}, dropping cached metadata: {e}")
+                self.invalidate(spreadsheet_id)
+            raise
+
+
+metadata_cache = SpreadsheetMetadataCache()
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from googleapiclient.errors import HttpError
+
+from domain.sheets.service_provider import sheets_provider
+
+# Окремий пул для блокуючого googleapiclient .execute(), у кожного потоку свій AuthorizedHttp
+sheets_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='sheets')
+
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def pause(self, seconds):
+        # після 429 квота вже вичерпана, тому обнуляємо і відкладаємо всіх
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class SheetsRateLimiter:
+    """Спільний ліміт запитів до Google Sheets API (read/write квоти на хвилину)."""
+
+    def __init__(self, read_per_minute=60, write_per_minute=60, max_retries=5):
+        self.buckets = {
+            'read': TokenBucket(read_per_minute),
+            'write': TokenBucket(write_per_minute),
+        }
+        self.max_retries = max_retries
+        self.throttled = 0
+
+    @staticmethod
+    def _retry_after(error, attempt):
+        retry_after = error.resp.get('retry-after') if error.resp else None
+        try:
+            return max(float(retry_after), 1.0)
+        except (TypeError, ValueError):
+            return min(2 ** attempt + random.uniform(0, 1), 64)
+
+    @staticmethod
+    def _execute(request):
+        return request.execute(http=sheets_provider.http())
+
+    async def execute(self, request, kind='write'):
+        bucket = self.buckets[kind]
+        for attempt in range(self.max_retries + 1):
+            await bucket.acquire()
+            try:
+                return await asyncio.get_running_loop().run_in_executor(sheets_executor, self._execute, request)
+            except HttpError as e:
+                if e.resp.status != 429 or attempt == self.max_retries:
+                    raise
+                delay = self._retry_after(e, attempt)
+                self.throttled += 1
+                logging.warning(f"Sheets {kind} quota exceeded, retrying in {delay:.1f}s (attempt {attempt + 1})")
+                bucket.pause(delay)
+
+
+sheets_limiter = SheetsRateLimiter()
@@ -0,0 +1,97 @@
+import operator
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import islice, repeat
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M"
+
+# Формати, які збігаються з isoformat() і рахуються без strftime
+_ISO_FORMATS = {
+    "%Y-%m-%d %H:%M": lambda column: map(operator.methodcaller('isoformat', ' ', 'minutes'), column),
+    "%Y-%m-%d": lambda column: map(date.isoformat, map(datetime.date, column)),
+}
+
+
+def _convert_value(value, datetime_format):
+    if isinstance(value, datetime):
+        value = value.strftime(datetime_format)
+    if isinstance(value, Decimal):
+        value = float(value)
+    return value
+
+
+def _convert_datetimes(column, datetime_format):
+    values = [value for value in column if value is not None]
+    earliest = min(values)
+    # isoformat інакше пише роки < 1000 і timezone, тоді лишаємо strftime
+    if datetime_format in _ISO_FORMATS and earliest.year >= 1000 and earliest.tzinfo is None:
+        converted = _ISO_FORMATS[datetime_format](values)
+    else:
+        converted = map(datetime.strftime, values, repeat(datetime_format))
+    if len(values) == len(column):
+        return list(converted)
+    return [None if value is None else next(converted) for value in column]
+
+
+def _convert_decimals(column):
+    if None not in column:
+        return list(map(float, column))
+    return [None if value is None else float(value) for value in column]
+
+
+def convert_column(column, datetime_format):
+    """Тип колонки визначається один раз за множиною типів значень, а не isinstance для кожної клітинки."""
+    value_types = set(map(type, column))
+    value_types.discard(type(None))
+    if value_types == {datetime}:
+        return _convert_datetimes(column, datetime_format)
+    if value_types == {Decimal}:
+        return _convert_decimals(column)
+    if any(issubclass(value_type, (datetime, Decimal)) for value_type in value_types):
+        # змішані типи — як раніше, по одній клітинці
+        return [_convert_value(value, datetime_format) for value in column]
+    return column
+
+
+class RowFormatter:
+    """Перетворює список словників у рядки для Sheets, колонка за колонкою."""
+
+    def __init__(self, headers, datetime_format=DATETIME_FORMAT, defaults=None):
+        self.headers = list(headers)
+        self.datetime_format = datetime_format
+        self.defaults = defaults
+
+    def _columns(self, rows):
+        if self.defaults is not None:
+            return [[row.get(key, self.defaults.get(key)) for row in rows] for key in self.headers]
+        if len(self.headers) == 1:
+            key = self.headers[0]
+            return [[row[key] for row in rows]]
+        return [list(column) for column in zip(*map(operator.itemgetter(*self.headers), rows))]
+
+    def format(self, rows):
+        if not rows:
+            return []
+        columns = [convert_column(column, self.datetime_format) for column in self._columns(rows)]
+        return list(map(list, zip(*columns)))
+
+
+def format_rows(data, datetime_format=DATETIME_FORMAT):
+    if not data:
+        return []
+    formatter = RowFormatter(data[0].keys(), datetime_format)
+    return [formatter.headers] + formatter.format(data)
+
+
+def iter_format_rows(rows, chunk_size=1000, datetime_format=DATETIME_FORMAT):
+    """Генератор: заголовки, потім рядки; форматує блоками по chunk_size."""
+    rows = iter(rows)
+    formatter = None
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        if formatter is None:
+            formatter = RowFormatter(chunk[0].keys(), datetime_format)
+            yield formatter.headers
+        yield from formatter.format(chunk)
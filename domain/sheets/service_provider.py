@@ -0,0 +1,74 @@
+import logging
+import os
+import pickle
+import threading
+from datetime import datetime, timedelta
+
+import google_auth_httplib2
+from google.auth.transport.requests import Request
+from google_auth_oauthlib.flow import InstalledAppFlow
+from googleapiclient.discovery import build
+from googleapiclient.http import build_http
+
+
+class SheetsServiceProvider:
+    """Один раз на процес завантажує облікові дані і будує клієнт Sheets API."""
+
+    def __init__(self, token_filename='token.pickle', creds_filename='credential.json', refresh_margin=300):
+        self.SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+        self.TOKEN_FILENAME = token_filename
+        self.CREDS_FILENAME = creds_filename
+        self.refresh_margin = timedelta(seconds=refresh_margin)
+        self._creds = None
+        self._service = None
+        self._lock = threading.RLock()
+        self._local = threading.local()
+
+    def _save(self, creds):
+        with open(self.TOKEN_FILENAME, 'wb') as token:
+            pickle.dump(creds, token)
+
+    def _load(self):
+        creds = None
+        if os.path.exists(self.TOKEN_FILENAME):
+            with open(self.TOKEN_FILENAME, 'rb') as token:
+                creds = pickle.load(token)
+        if not creds or not (creds.valid or creds.refresh_token):
+            flow = InstalledAppFlow.from_client_secrets_file(self.CREDS_FILENAME, self.SCOPES)
+            creds = flow.run_local_server(port=0)
+            self._save(creds)
+        return creds
+
+    def _needs_refresh(self, creds):
+        if not creds.valid:
+            return True
+        # google-auth зберігає expiry як naive UTC
+        return creds.expiry is not None and creds.expiry - self.refresh_margin <= datetime.utcnow()
+
+    def credentials(self):
+        with self._lock:
+            if self._creds is None:
+                self._creds = self._load()
+            if self._creds.refresh_token and self._needs_refresh(self._creds):
+                self._creds.refresh(Request())
+                self._save(self._creds)
+                logging.info(f"Sheets token refreshed, expires at {self._creds.expiry}")
+            return self._creds
+
+    def service(self):
+        with self._lock:
+            if self._service is None:
+                self._service = build('sheets', 'v4', credentials=self.credentials(), cache_discovery=False)
+            return self._service
+
+    def http(self):
+        # httplib2.Http не потокобезпечний, тому у кожного потоку свій;
+        # build_http, як і build(): таймаут 60 с і 308 не вважається редіректом
+        creds = self.credentials()
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = self._local.http = google_auth_httplib2.AuthorizedHttp(creds, http=build_http())
+        return http
+
+
+sheets_provider = SheetsServiceProvider()
@@ -0,0 +1,60 @@
+from itertools import islice
+
+from databases.DbExecutor import run_db
+from domain.sheets.rate_limiter import sheets_limiter
+from domain.sheets.row_formatter import iter_format_rows
+from domain.sheets.service_provider import sheets_provider
+
+
+def next_chunk(iterator, size):
+    return list(islice(iterator, size))
+
+
+def close_iterators(*iterators):
+    for iterator in iterators:
+        if hasattr(iterator, 'close'):
+            try:
+                iterator.close()
+            except ValueError:
+                # генератор ще виконується в потоці БД (задачу скасували) — закриється разом з ним
+                pass
+
+
+async def write_streaming(rows, range_name, table_id, stamp_row, formatter=iter_format_rows, chunk_rows=5000):
+    """
+    Пише вибірку з генератора блоками по chunk_rows рядків у послідовні діапазони листа.
+    formatter(rows) віддає заголовки і рядки-списки. Перший блок читається до очищення листа,
+    тож помилка запиту лишає попередні дані. Повертає кількість записаних рядків даних.
+    """
+    service = sheets_provider.service()
+    sheet_name = range_name.split('!')[0]
+    values = formatter(rows)
+    try:
+        # серверний курсор блокуючий, тому блоки читаються в пулі потоків БД
+        chunk = await run_db(next_chunk, values, chunk_rows)
+        await sheets_limiter.execute(service.spreadsheets().values().clear(
+            spreadsheetId=table_id,
+            range=sheet_name,
+            body={}
+        ))
+
+        block = [stamp_row] + chunk
+        start_row = 1
+        written = 0
+        while block:
+            await sheets_limiter.execute(service.spreadsheets().values().update(
+                spreadsheetId=table_id,
+                range=f"{sheet_name}!A{start_row}",
+                valueInputOption='RAW',
+                body={'values': block}
+            ))
+            start_row += len(block)
+            written += len(chunk)
+            chunk = await run_db(next_chunk, values, chunk_rows)
+            block = chunk
+    finally:
+        # SSCursor при закритті дочитує решту рядків, тому теж не в loop
+        await run_db(close_iterators, values, rows)
+
+    # written враховує і рядок заголовків
+    return max(written - 1, 0)
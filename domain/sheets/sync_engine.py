@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import time
+from collections import Counter, defaultdict
+
+from databases.DbExecutor import run_db
+from domain.sheets.write_planner import SpreadsheetWritePlan
+from domain.transform_executor import transform_executor
+
+
+class SyncJob:
+    """Одна вивантажка: метод репозиторію -> діапазон у таблиці."""
+
+    def __init__(self, repository, method, range_name, spreadsheet_id, args=(), incremental=False, stream=False,
+                 interval=15 * 60, partitions=None):
+        self.repository = repository
+        self.method = method
+        self.range_name = range_name
+        self.spreadsheet_id = spreadsheet_id
+        self.args = tuple(args)
+        self.incremental = incremental
+        # stream: метод репозиторію повертає генератор, лист пишеться блоками
+        self.stream = stream
+        # як часто оновлювати в режимі демона, секунд
+        self.interval = interval
+        # partitions: {ключ: діапазон}; метод повертає {ключ: рядки}, і кожна група пишеться в свій діапазон
+        self.partitions = partitions
+
+    @property
+    def name(self):
+        if self.partitions:
+            return f"{self.repository.__name__}.{self.method}() -> {len(self.partitions)} ranges"
+        args = ", ".join(str(arg) for arg in self.args)
+        return f"{self.repository.__name__}.{self.method}({args}) -> {self.range_name}"
+
+    def fetch(self):
+        return getattr(self.repository(), self.method)(*self.args)
+
+
+class JobTiming:
+    def __init__(self, name):
+        self.name = name
+        self.fetch_time = 0.0
+        self.format_time = 0.0
+        self.write_time = 0.0
+        self.rows = 0
+        self.error = None
+
+    @property
+    def total_time(self):
+        return self.fetch_time + self.format_time + self.write_time
+
+
+class SheetSyncEngine:
+    def __init__(self, writer, formatter, stream_writer=None, max_concurrency=8, per_spreadsheet_concurrency=2,
+                 batch_writes=True):
+        self.writer = writer
+        self.formatter = formatter
+        self.stream_writer = stream_writer
+        self.max_concurrency = max_concurrency
+        self.per_spreadsheet_concurrency = per_spreadsheet_concurrency
+        # batch_writes: повні перезаписи однієї таблиці збираються в один SpreadsheetWritePlan
+        self.batch_writes = batch_writes
+
+    async def run(self, jobs):
+        global_limit = asyncio.Semaphore(self.max_concurrency)
+        spreadsheet_limits = defaultdict(lambda: asyncio.Semaphore(self.per_spreadsheet_concurrency))
+        plans = {}
+        pending = Counter()
+        if self.batch_writes:
+            for job in jobs:
+                if not job.stream:
+                    plans.setdefault(job.spreadsheet_id, SpreadsheetWritePlan(job.spreadsheet_id))
+                    pending[job.spreadsheet_id] += 1
+        flush_timings = []
+
+        started = time.perf_counter()
+        timings = await asyncio.gather(*(
+            self._run_job(job, global_limit, spreadsheet_limits[job.spreadsheet_id], plans, pending, flush_timings)
+            for job in jobs
+        ))
+        timings = list(timings) + flush_timings
+        self.report(timings, time.perf_counter() - started)
+        return timings
+
+    async def _flush(self, plan, global_limit):
+        timing = JobTiming(f"flush {plan.spreadsheet_id}")
+        try:
+            async with global_limit:
+                started = time.perf_counter()
+                await plan.flush()
+                timing.write_time = time.perf_counter() - started
+        except Exception as e:
+            timing.error = e
+            logging.error(f"Sync flush failed: {plan.spreadsheet_id}: {e}")
+        return timing
+
+    async def _run_job(self, job, global_limit, spreadsheet_limit, plans, pending, flush_timings):
+        plan = plans.get(job.spreadsheet_id) if not job.stream else None
+        try:
+            return await self._sync_job(job, global_limit, spreadsheet_limit, plan)
+        finally:
+            if plan is not None:
+                pending[job.spreadsheet_id] -= 1
+                # остання задача цієї таблиці відправляє все накопичене
+                if pending[job.spreadsheet_id] == 0:
+                    flush_timings.append(await self._flush(plan, global_limit))
+
+    async def _sync_job(self, job, global_limit, spreadsheet_limit, plan):
+        timing = JobTiming(job.name)
+        try:
+            if job.stream:
+                # вибірка, форматування і запис йдуть разом, блоками
+                async with spreadsheet_limit, global_limit:
+                    started = time.perf_counter()
+                    timing.rows = await self.stream_writer(job.fetch(), job.range_name, job.spreadsheet_id)
+                    timing.write_time = time.perf_counter() - started
+                return timing
+
+            # pymysql блокуючий, тому вибірку виносимо в пул потоків БД
+            async with global_limit:
+                started = time.perf_counter()
+                data = await run_db(job.fetch)
+                timing.fetch_time = time.perf_counter() - started
+
+            # None — помилка запиту (зокрема таймаут пулу); порожній лист замість даних не пишемо
+            if data is None:
+                raise RuntimeError("fetch failed")
+            if job.partitions:
+                batches = [(data.get(key) or [], range_name) for key, range_name in job.partitions.items()]
+            else:
+                batches = [(data, job.range_name)]
+
+            for rows, range_name in batches:
+                started = time.perf_counter()
+                # великі вибірки форматуються в пулі потоків, щоб інші задачі не чекали на loop
+                values = await transform_executor.run(self.formatter, rows, size=len(rows or ()))
+                timing.format_time += time.perf_counter() - started
+                timing.rows += max(len(values) - 1, 0)
+
+                async with spreadsheet_limit, global_limit:
+                    started = time.perf_counter()
+                    await self.writer(values, range_name, job.spreadsheet_id, incremental=job.incremental, plan=plan)
+                    timing.write_time += time.perf_counter() - started
+        except Exception as e:
+            timing.error = e
+            logging.error(f"Sync job failed: {timing.name}: {e}")
+        return timing
+
+    @staticmethod
+    def report(timings, wall_time):
+        lines = [f"{'job':<70} {'rows':>7} {'fetch':>7} {'format':>7} {'write':>7} {'total':>7}"]
+        for timing in sorted(timings, key=lambda t: t.total_time, reverse=True):
+            status = f" ERROR: {timing.error}" if timing.error else ""
+            lines.append(
+                f"{timing.name:<70} {timing.rows:>7} {timing.fetch_time:>7.2f} {timing.format_time:>7.2f} "
+                f"{timing.write_time:>7.2f} {timing.total_time:>7.2f}{status}"
+            )
+        serial_time = sum(timing.total_time for timing in timings)
+        failed = sum(1 for timing in timings if timing.error)
+        lines.append(f"{len(timings)} jobs ({failed} failed) in {wall_time:.2f}s wall, {serial_time:.2f}s serial")
+        logging.info("Sync report:\n" + "\n".join(lines))
@@ -0,0 +1,68 @@
+import logging
+
+from domain.sheets.metadata_cache import metadata_cache
+from domain.sheets.rate_limiter import sheets_limiter
+from domain.sheets.service_provider import sheets_provider
+
+
+class SpreadsheetWritePlan:
+    """
+    Збирає очищення, значення і форматування для всіх листів однієї таблиці
+    і відправляє їх трьома запитами: values.batchClear, batchUpdate, values.batchUpdate.
+    """
+
+    def __init__(self, spreadsheet_id, value_input_option='RAW'):
+        self.spreadsheet_id = spreadsheet_id
+        self.value_input_option = value_input_option
+        self.clear_ranges = []
+        self.requests = []
+        self.value_ranges = []
+        self._on_success = []
+
+    def clear(self, range_name):
+        self.clear_ranges.append(range_name)
+
+    def format(self, *requests):
+        self.requests.extend(requests)
+
+    def write(self, range_name, values):
+        self.value_ranges.append({'range': range_name, 'values': values})
+
+    def on_success(self, callback):
+        self._on_success.append(callback)
+
+    @property
+    def empty(self):
+        return not (self.clear_ranges or self.requests or self.value_ranges)
+
+    async def flush(self):
+        if self.empty:
+            return
+        service = sheets_provider.service()
+        clear_ranges, requests, value_ranges, callbacks = (
+            self.clear_ranges, self.requests, self.value_ranges, self._on_success)
+        self.clear_ranges, self.requests, self.value_ranges, self._on_success = [], [], [], []
+
+        # sheetId у запитах взяті з metadata_cache
+        with metadata_cache.invalidating(self.spreadsheet_id):
+            if clear_ranges:
+                await sheets_limiter.execute(service.spreadsheets().values().batchClear(
+                    spreadsheetId=self.spreadsheet_id,
+                    body={'ranges': clear_ranges}
+                ))
+            # форматування і зміни розмірів — до запису значень
+            if requests:
+                await sheets_limiter.execute(service.spreadsheets().batchUpdate(
+                    spreadsheetId=self.spreadsheet_id,
+                    body={'requests': requests}
+                ))
+            if value_ranges:
+                await sheets_limiter.execute(service.spreadsheets().values().batchUpdate(
+                    spreadsheetId=self.spreadsheet_id,
+                    body={'valueInputOption': self.value_input_option, 'data': value_ranges}
+                ))
+
+        for callback in callbacks:
+            callback()
+        logging.info(f"Flushed {self.spreadsheet_id}: {len(clear_ranges)} clears, {len(value_ranges)} ranges, "
+                     f"{len(requests)} format requests")
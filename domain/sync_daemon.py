@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import signal
+import time
+
+import schedule
+
+
+class SyncDaemon:
+    """
+    Постійний процес замість одноразового запуску з cron: кожна задача має свій інтервал,
+    пули з'єднань і клієнт Sheets живуть між запусками.
+    Задача не стартує, поки не завершився її попередній запуск.
+    """
+
+    def __init__(self, tick=1.0, shutdown_timeout=120):
+        self.tick = tick
+        self.shutdown_timeout = shutdown_timeout
+        self.scheduler = schedule.Scheduler()
+        self._running = {}
+        self._stopping = None
+        self.skipped = 0
+
+    def every(self, seconds, name, job):
+        """job — корутинна функція без аргументів."""
+        self.scheduler.every(seconds).seconds.do(self._launch, name, job).tag(name)
+
+    def _launch(self, name, job):
+        if name in self._running:
+            self.skipped += 1
+            logging.warning(f"Daemon: '{name}' is still running, skipping this tick")
+            return
+        self._running[name] = asyncio.create_task(self._run(name, job))
+
+    async def _run(self, name, job):
+        started = time.perf_counter()
+        try:
+            await job()
+            logging.info(f"Daemon: '{name}' finished in {time.perf_counter() - started:.2f}s")
+        except Exception as e:
+            logging.exception(f"Daemon: '{name}' failed: {e}")
+        finally:
+            self._running.pop(name, None)
+
+    def stop(self):
+        if self._stopping is not None and not self._stopping.is_set():
+            logging.info("Daemon: stop requested, waiting for running jobs")
+            self._stopping.set()
+
+    def _install_signal_handlers(self):
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                # Windows: add_signal_handler не підтримується
+                signal.signal(sig, lambda *_: loop.call_soon_threadsafe(self.stop))
+
+    async def run(self, run_immediately=True):
+        self._stopping = asyncio.Event()
+        self._install_signal_handlers()
+        logging.info(f"Daemon started with {len(self.scheduler.get_jobs())} scheduled jobs")
+
+        if run_immediately:
+            self.scheduler.run_all()
+        while not self._stopping.is_set():
+            self.scheduler.run_pending()
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.tick)
+            except asyncio.TimeoutError:
+                pass
+
+        self.scheduler.clear()
+        running = list(self._running.values())
+        if running:
+            done, pending = await asyncio.wait(running, timeout=self.shutdown_timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+                logging.warning(f"Daemon: cancelled {len(pending)} jobs after {self.shutdown_timeout}s")
+        logging.info(f"Daemon stopped ({self.skipped} overlapping ticks skipped)")
@@ -0,0 +1,43 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TransformExecutor:
+    """
+    Виносить CPU-роботу над великими вибірками (форматування, сортування, запити форматування)
+    з потоку event loop у пул потоків. Потоки, а не процеси: рядки не серіалізуються туди й назад,
+    а loop між перемиканнями GIL встигає обслуговувати запити до Sheets і БД.
+    Малі вибірки обробляються на місці — передача в пул для них дорожча за саму роботу.
+    """
+
+    def __init__(self, threshold=10000, max_workers=2):
+        self.threshold = threshold
+        self.max_workers = max_workers
+        self._pool = None
+        self.inline = 0
+        self.offloaded = 0
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='transform')
+        return self._pool
+
+    async def run(self, func, *args, size=0):
+        """size — кількість рядків, за якою вирішуємо, чи варто виносити роботу з loop."""
+        if size < self.threshold:
+            self.inline += 1
+            return func(*args)
+        self.offloaded += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_pool(), functools.partial(func, *args))
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        logging.info(f"Transform executor: {self.inline} inline, {self.offloaded} offloaded")
+
+
+transform_executor = TransformExecutor()
@@ -1,13 +1,13 @@
+import argparse
 import asyncio
 import logging
-import os
-import pickle
 from datetime import datetime
 
-from _decimal import Decimal
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-
+from databases.ConnectionPool import close_all_pools, pool_stats
+from databases.DbExecutor import run_db
+from databases.ExportColumns import validate_export_columns
+from databases.QueryCache import query_cache
+from databases.LookupCache import lookup_cache_stats
 from databases.repository.AppsRentRp import AppsRentRp
 from databases.repository.AutoModeratorRp import AutoModeratorRp
 from databases.repository.GoogleAgencyRp import GoogleAgencyRp
@@ -15,6 +15,14 @@ from databases.repository.ShopRp import ShopRp
 from databases.repository.TeamInfoMessagingRp import TeamInfoMessagingRp
 from domain.mt_google.google_ref_trans import GoogleSheetUploaderLimited
 from domain.mt_google.mt_google_analytics import start_google_analitics
+from domain.sheets.incremental_sync import SheetSnapshotStore, write_incremental
+from domain.sheets.rate_limiter import sheets_limiter
+from domain.sheets.row_formatter import format_rows
+from domain.sheets.service_provider import sheets_provider
+from domain.sheets.stream_writer import write_streaming
+from domain.sheets.sync_engine import SheetSyncEngine, SyncJob
+from domain.sync_daemon import SyncDaemon
+from domain.transform_executor import transform_executor
 from private_cfg import *
 
 # mt shop
@@ -36,6 +44,19 @@ chats_pp_ads = "ChatsPartnersADS!A1"
 chats_media = "ChatsMedia!A1"
 users_info = "Users!A1"
 
+CHAT_RANGES = {
+    'creo': chats_creo,
+    'google': chats_google,
+    'fb': chats_fb,
+    'console': chats_console,
+    'agency_fb': chats_agency_fb,
+    'agency_google': chats_agency_google,
+    'apps': chats_apps,
+    'pp_web': chats_pp_web,
+    'pp_ads': chats_pp_ads,
+    'media': chats_media,
+}
+
 # mt auto moderator
 users_auto_moder = "Users!A1"
 
@@ -58,161 +79,213 @@ google_account_transactions = "Account Transactions"
 google_mcc_transactions = "MCC Transactions"
 
 
+# інтервали оновлення в режимі демона, секунд
+HOT_INTERVAL = 60
+WARM_INTERVAL = 5 * 60
+DEFAULT_INTERVAL = 15 * 60
+STATIC_INTERVAL = 60 * 60
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logging.getLogger('googleapiclient.discovery_cache').setLevel(logging.ERROR)
 
+snapshot_store = SheetSnapshotStore()
+
 
-def clear_range(range_name, table_id, service):
-    service.spreadsheets().values().clear(
+async def clear_range(range_name, table_id, service):
+    await sheets_limiter.execute(service.spreadsheets().values().clear(
         spreadsheetId=table_id,
         range=range_name.replace("!A1", ""),
         body={}
-    ).execute()
+    ))
 
 
-def update_google_sheets_(data, range_name, table_id):
-    scopes = ['https://www.googleapis.com/auth/spreadsheets']
+async def update_google_sheets_(data, range_name, table_id, incremental=False, plan=None):
+    service = sheets_provider.service()
+    stamp_row = [f"last updated: {datetime.now().strftime('%Y-%m-%d %H:%M')}"]
 
-    # Шлях до файлу облікових даних
-    creds_filename = 'credential.json'
-    token_filename = 'token.pickle'
+    # Пишемо тільки змінені рядки, якщо є знімок попереднього запису
+    if incremental and await write_incremental(service, data, stamp_row, range_name, table_id, snapshot_store,
+                                               write_plan=plan):
+        return
 
-    # Завантажуємо збережені облікові дані, якщо вони є
-    if os.path.exists(token_filename):
-        with open(token_filename, 'rb') as token:
-            creds = pickle.load(token)
-    else:
-        # Якщо збережених облікових даних немає, виконуємо авторизацію
-        flow = InstalledAppFlow.from_client_secrets_file(creds_filename, scopes)
-        creds = flow.run_local_server(port=0)
-        # Зберігаємо облікові дані для наступних запусків
-        with open(token_filename, 'wb') as token:
-            pickle.dump(creds, token)
+    if plan is not None:
+        # Запис піде разом з іншими листами цієї таблиці при plan.flush()
+        sheet_name = range_name.split('!')[0]
+        if incremental:
+            snapshot_store.drop(table_id, sheet_name)
+            if data:
+                plan.on_success(lambda: snapshot_store.save(table_id, sheet_name, data))
+        plan.clear(range_name.replace("!A1", ""))
+        plan.write(range_name, [stamp_row] + data)
+        return
 
-    service = build('sheets', 'v4', credentials=creds)
+    await clear_range(range_name, table_id, service)
 
-    clear_range(range_name, table_id, service)
-    values = [list(row) for row in data]
-
-    # Опції для запису
+    # Опції для запису (рядки форматера вже списки, не копіюємо їх вдруге)
     body = {
-        'values': [[f"last updated: {datetime.now().strftime('%Y-%m-%d %H:%M')}"]] + values
+        'values': [stamp_row] + data
     }
 
     # # Виконання запису
-    sheet = service.spreadsheets().values().update(
+    sheet = await sheets_limiter.execute(service.spreadsheets().values().update(
         spreadsheetId=table_id,
         range=range_name,
         valueInputOption='RAW',
         body=body
-    ).execute()
+    ))
+
+    if incremental and data:
+        snapshot_store.save(table_id, range_name.split('!')[0], data)
 
     print(f"{range_name} | Updated {sheet.get('updatedCells')} cells at {datetime.now().strftime('%Y-%m-%d %H:%M')}")
 
 
 def format_data_for_sheets(data):
-    if not data:
-        return []
-
-    # Отримуємо заголовки з ключів першого словника
-    headers = list(data[0].keys())
-
-    # Додаємо заголовки як перший рядок
-    formatted_data = [headers]
-
-    # Додаємо дані
-    for row in data:
-        formatted_row = []
-        for key in headers:
-            value = row[key]
-            # Якщо значення є datetime, перетворюємо його у строку
-            if isinstance(value, datetime):
-                value = value.strftime("%Y-%m-%d %H:%M")
-
-            if isinstance(value, Decimal):
-                value = float(value)
-
-            formatted_row.append(value)
-        formatted_data.append(formatted_row)
-
-    return formatted_data
-
-
-def update_all_data():
-    # update mt shop
-    update_google_sheets_(format_data_for_sheets(ShopRp().get_users_data()), users_shop, SPREADSHEET_SHOP_ID)
-    update_google_sheets_(format_data_for_sheets(ShopRp().get_orders_data()), orders_shop, SPREADSHEET_SHOP_ID)
-    update_google_sheets_(format_data_for_sheets(ShopRp().get_items_data()), items_shop, SPREADSHEET_SHOP_ID)
-    update_google_sheets_(format_data_for_sheets(ShopRp().get_categories_data()), categories_shop, SPREADSHEET_SHOP_ID)
-
-    # update mt team info
-    update_google_sheets_(format_data_for_sheets(TeamInfoMessagingRp().get_chat_data('creo')), chats_creo,
-                          SPREADSHEET_TEAM_INFO_ID)
-    update_google_sheets_(format_data_for_sheets(TeamInfoMessagingRp().get_chat_data('google')), chats_google,
-                          SPREADSHEET_TEAM_INFO_ID)
-    update_google_sheets_(format_data_for_sheets(TeamInfoMessagingRp().get_chat_data('fb')), chats_fb,
-                          SPREADSHEET_TEAM_INFO_ID)
-    update_google_sheets_(format_data_for_sheets(TeamInfoMessagingRp().get_chat_data('console')), chats_console,
-                          SPREADSHEET_TEAM_INFO_ID)
-    update_google_sheets_(format_data_for_sheets(TeamInfoMessagingRp().get_chat_data('agency_fb')), chats_agency_fb,
-                          SPREADSHEET_TEAM_INFO_ID)
-    update_google_sheets_(format_data_for_sheets(TeamInfoMessagingRp().get_chat_data('agency_google')),
-                          chats_agency_google, SPREADSHEET_TEAM_INFO_ID)
-    update_google_sheets_(format_data_for_sheets(TeamInfoMessagingRp().get_chat_data('apps')), chats_apps,
-                          SPREADSHEET_TEAM_INFO_ID)
-    update_google_sheets_(format_data_for_sheets(TeamInfoMessagingRp().get_chat_data('pp_web')), chats_pp_web,
-                          SPREADSHEET_TEAM_INFO_ID)
-    update_google_sheets_(format_data_for_sheets(TeamInfoMessagingRp().get_chat_data('pp_ads')), chats_pp_ads,
-                          SPREADSHEET_TEAM_INFO_ID)
-    update_google_sheets_(format_data_for_sheets(TeamInfoMessagingRp().get_chat_data('media')), chats_media,
-                          SPREADSHEET_TEAM_INFO_ID)
-    update_google_sheets_(format_data_for_sheets(TeamInfoMessagingRp().get_users_from_info_bot()), users_info,
-                          SPREADSHEET_TEAM_INFO_ID)
-
-    # update auto moderator
-    update_google_sheets_(format_data_for_sheets(AutoModeratorRp().get_all_users()), users_auto_moder,
-                          SPREADSHEET_AUTO_MODERATOR_ID)
-
-    # update apps rent
-    update_google_sheets_(format_data_for_sheets(AppsRentRp().get_all_users()), users_apps_rent,
-                          SPREADSHEET_APPS_RENT_ID)
-    update_google_sheets_(format_data_for_sheets(AppsRentRp().get_all_teams()), teams_apps_rent,
-                          SPREADSHEET_APPS_RENT_ID)
-    update_google_sheets_(format_data_for_sheets(AppsRentRp().get_all_flows()), flows_apps_rent,
-                          SPREADSHEET_APPS_RENT_ID)
-    update_google_sheets_(format_data_for_sheets(AppsRentRp().get_all_domains()), domains_apps_rent,
-                          SPREADSHEET_APPS_RENT_ID)
-    update_google_sheets_(format_data_for_sheets(AppsRentRp().get_all_apps()), apps_apps_rent, SPREADSHEET_APPS_RENT_ID)
-
-    # update google agency
-    update_google_sheets_(format_data_for_sheets(GoogleAgencyRp().get_taxes_transactions()), google_taxes,
-                          SPREADSHEET_GOOGLE_AGENCY_ID)
-    # update google agency 2
-    # update_google_sheets_(format_data_for_sheets(GoogleAgencyRp().get_refunded_accounts()), google_accounts, SPREADSHEET_GOOGLE_AGENCY_ID)
-    # update_google_sheets_(format_data_for_sheets(GoogleAgencyRp().get_refunded_accounts()), google_refunded_accounts, SPREADSHEET_GOOGLE_AGENCY_ID)
-    # update_google_sheets_(format_data_for_sheets(GoogleAgencyRp().get_teams()), google_teams, SPREADSHEET_GOOGLE_AGENCY_ID)
-    # update_google_sheets_(format_data_for_sheets(GoogleAgencyRp().get_mcc()), google_mcc, SPREADSHEET_GOOGLE_AGENCY_ID)
-    # update_google_sheets_(format_data_for_sheets(GoogleAgencyRp().get_balances()), google_balances, SPREADSHEET_GOOGLE_AGENCY_ID)
-    # update_google_sheets_(format_data_for_sheets(GoogleAgencyRp().get_account_transactions()), google_account_transactions, SPREADSHEET_GOOGLE_AGENCY_ID)
-    # update_google_sheets_(format_data_for_sheets(GoogleAgencyRp().get_mcc_transactions()), google_mcc_transactions, SPREADSHEET_GOOGLE_AGENCY_ID)
+    # Типи колонок визначаються один раз на вибірку, а не для кожної клітинки
+    return format_rows(data)
+
+
+async def update_google_sheets_streaming(rows, range_name, table_id):
+    """Для SyncJob(stream=True): рядки з серверного курсора пишуться блоками, в пам'яті один блок."""
+    stamp_row = [f"last updated: {datetime.now().strftime('%Y-%m-%d %H:%M')}"]
+    rows_count = await write_streaming(rows, range_name, table_id, stamp_row)
+    print(f"{range_name} | Streamed {rows_count} rows at {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+    return rows_count
+
+
+SYNC_JOBS = [
+    # mt shop
+    SyncJob(ShopRp, 'get_users_data', users_shop, SPREADSHEET_SHOP_ID, incremental=True, interval=WARM_INTERVAL),
+    SyncJob(ShopRp, 'get_orders_data_incremental', orders_shop, SPREADSHEET_SHOP_ID, incremental=True,
+            interval=HOT_INTERVAL),
+    SyncJob(ShopRp, 'get_items_data', items_shop, SPREADSHEET_SHOP_ID),
+    SyncJob(ShopRp, 'get_categories_data', categories_shop, SPREADSHEET_SHOP_ID, interval=STATIC_INTERVAL),
+
+    # mt team info
+    # усі категорії чатів одним SELECT, розкладаються по листах у пам'яті
+    SyncJob(TeamInfoMessagingRp, 'get_chats_by_flags', None, SPREADSHEET_TEAM_INFO_ID,
+            args=(tuple(CHAT_RANGES),), partitions=CHAT_RANGES, incremental=True, interval=WARM_INTERVAL),
+    # користувачі бота ростуть без меж і не мають інкрементального шляху, тому серверним курсором
+    SyncJob(TeamInfoMessagingRp, 'iter_users_from_info_bot', users_info, SPREADSHEET_TEAM_INFO_ID, stream=True),
+
+    # auto moderator
+    SyncJob(AutoModeratorRp, 'get_all_users', users_auto_moder, SPREADSHEET_AUTO_MODERATOR_ID),
+
+    # apps rent
+    SyncJob(AppsRentRp, 'get_all_users', users_apps_rent, SPREADSHEET_APPS_RENT_ID),
+    SyncJob(AppsRentRp, 'get_all_teams', teams_apps_rent, SPREADSHEET_APPS_RENT_ID),
+    SyncJob(AppsRentRp, 'get_all_flows', flows_apps_rent, SPREADSHEET_APPS_RENT_ID),
+    SyncJob(AppsRentRp, 'get_all_domains', domains_apps_rent, SPREADSHEET_APPS_RENT_ID),
+    SyncJob(AppsRentRp, 'get_all_apps', apps_apps_rent, SPREADSHEET_APPS_RENT_ID),
+
+    # google agency
+    SyncJob(GoogleAgencyRp, 'get_taxes_transactions', google_taxes, SPREADSHEET_GOOGLE_AGENCY_ID),
+    # google agency 2
+    # SyncJob(GoogleAgencyRp, 'get_refunded_accounts', google_refunded_accounts, SPREADSHEET_GOOGLE_AGENCY_ID),
+    # SyncJob(GoogleAgencyRp, 'get_teams', google_teams, SPREADSHEET_GOOGLE_AGENCY_ID),
+    # SyncJob(GoogleAgencyRp, 'get_mcc', google_mcc, SPREADSHEET_GOOGLE_AGENCY_ID),
+    # SyncJob(GoogleAgencyRp, 'get_balances', google_balances, SPREADSHEET_GOOGLE_AGENCY_ID),
+]
+
+
+async def update_all_data(jobs=SYNC_JOBS):
+    # Таблиці Shop, TeamInfo, AutoModerator і AppsRent оновлюються паралельно
+    engine = SheetSyncEngine(writer=update_google_sheets_, formatter=format_data_for_sheets,
+                             stream_writer=update_google_sheets_streaming)
+    timings = await engine.run(jobs)
+    failed = [timing for timing in timings if timing.error]
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {len(timings)} sync jobs failed") from failed[0].error
+
+
+async def gather_logged(*coros):
+    """
+    Як asyncio.gather, але падіння однієї задачі не зупиняє інші; помилки логуються.
+    Результати перевіряє raise_failures, коли всі кроки вже завершились.
+    """
+    results = await asyncio.gather(*coros, return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            logging.error("Concurrent task failed", exc_info=result)
+    return results
+
+
+def raise_failures(results):
+    failures = [result for result in results if isinstance(result, Exception)]
+    if failures:
+        raise RuntimeError(f"{len(failures)} of {len(results)} tasks failed") from failures[0]
+
+
+async def upload_agency_transactions():
+    uploader = GoogleSheetUploaderLimited()
+    # три вкладки збираються паралельно: mcc transactions, account transactions, refunds
+    results = await gather_logged(
+        uploader.process_and_upload_mcc_transactions(sheet_name=google_mcc_transactions, flush=False),
+        uploader.process_and_upload_accounts_transactions(sheet_name=google_account_transactions, flush=False),
+        uploader.process_and_upload_refunds(sheet_name=google_refunded_accounts, flush=False),
+    )
+    # mcc transactions і refunds одним batchClear + batchUpdate + values.batchUpdate, account transactions
+    # пишеться блоками одразу; вкладка потрапляє в план тільки після успішної вибірки і пошуку її sheetId
+    await uploader.flush()
+    raise_failures(results)
+
+
+def log_stats():
+    for db_name, stats in pool_stats().items():
+        logging.info(f"DB pool {db_name}: {stats}")
+    for name, stats in lookup_cache_stats().items():
+        logging.info(f"Lookup cache {name}: {stats}")
 
 
 async def main():
-    uploader = GoogleSheetUploaderLimited()
+    # списки колонок вивантажень звіряються зі схемою до першого запиту
+    await run_db(validate_export_columns)
+
+    # однакові вибірки різних вивантажень читаються з БД один раз за прогін
+    with query_cache.scope():
+        # all data raw database
+        results = await gather_logged(update_all_data())
+
+        # teams statistic + agency transactions and refunds, паралельно
+        results += await gather_logged(
+            start_google_analitics(),
+            upload_agency_transactions(),
+        )
+
+    log_stats()
+    transform_executor.shutdown()
+    # помилка будь-якого кроку — ненульовий код виходу для cron
+    raise_failures(results)
+
+
+def build_daemon():
+    daemon = SyncDaemon()
+
+    # SYNC_JOBS групуються за інтервалом, кожна група — один прогін SheetSyncEngine
+    groups = {}
+    for job in SYNC_JOBS:
+        groups.setdefault(job.interval, []).append(job)
+    for interval, jobs in sorted(groups.items()):
+        daemon.every(interval, f"sync every {interval}s", lambda jobs=jobs: update_all_data(jobs))
 
-    # all data raw database
-    update_all_data()
+    daemon.every(HOT_INTERVAL, "agency transactions", upload_agency_transactions)
+    daemon.every(DEFAULT_INTERVAL, "google analytics", start_google_analitics)
+    daemon.every(STATIC_INTERVAL, "stats", lambda: asyncio.to_thread(log_stats))
+    return daemon
 
-    # teams statistic
-    await start_google_analitics()
 
-    # mcc transactions
-    await uploader.process_and_upload_mcc_transactions(sheet_name=google_mcc_transactions)
-    # account transactions
-    await uploader.process_and_upload_accounts_transactions(sheet_name=google_account_transactions)
-    # refunds
-    await uploader.process_and_upload_refunds(sheet_name=google_refunded_accounts)
+async def run_daemon():
+    await run_db(validate_export_columns)
+    try:
+        await build_daemon().run()
+    finally:
+        log_stats()
+        transform_executor.shutdown()
+        close_all_pools()
 
 
 if __name__ == '__main__':
-    asyncio.run(main())
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--daemon', action='store_true', help="run as a resident process with per-job intervals")
+    cli_args = parser.parse_args()
+    asyncio.run(run_daemon() if cli_args.daemon else main())